@@ -0,0 +1,259 @@
+"""
+Synthesis Benchmarks
+This module times the synthesis tasks of the test files and generated scaling
+workloads, and compares the results against a stored JSON baseline.
+
+Usage:
+    python benchmark.py                          # run all tasks, compare with benchmarks/baseline.json
+    python benchmark.py --suite sweeps -k random # only the random-point sweep
+    python benchmark.py --update-baseline        # record the results as the new baseline
+    python benchmark.py --strategy best_first    # the same tasks searched best-first, recorded as name@best_first
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import unittest
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from observers import SynthesisObserver
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json")
+
+# Circles added one at a time by the multi-circle sweep, as (x, y, radius)
+SWEEP_CIRCLES = [(2, 3, 1), (6, 6, 2), (7, 2, 1)]
+# Point counts of the random-labelling sweep
+SWEEP_RANDOM_POINTS = [5, 10, 15, 20]
+# Example counts of the string sweep
+SWEEP_STRING_EXAMPLES = [5, 10, 20, 40]
+
+# Outcomes from best to worst; any other status ('unsolved', 'timeout', 'error: ...') ranks lowest
+STATUS_RANK = {'solved': 2, 'stopped': 1}
+
+FIRST_NAMES = ["John", "Jane", "Alice", "Bob", "Carol", "David", "Erin", "Frank", "Grace", "Heidi",
+               "Ivan", "Judy", "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent", "Walter"]
+LAST_NAMES = ["Smith", "Doe", "Johnson", "Brown", "Davis", "Miller", "Wilson", "Moore", "Taylor", "Clark"]
+
+class Task(NamedTuple):
+    """One synthesis problem: the examples and the iteration budget its test uses"""
+    name: str
+    kind: str  # 'shape' or 'string'
+    examples: List[Any]
+    max_iterations: int
+
+class CandidateCounter(SynthesisObserver):
+    """Totals the candidates enumerated over a run"""
+
+    def __init__(self):
+        self.candidates = 0
+
+    def on_iteration(self, metrics: Dict[str, Any]) -> None:
+        self.candidates += metrics['candidates']
+
+def test_file_tasks() -> List[Task]:
+    """
+    The synthesis tasks of test_part1.py and test_part2.py
+
+    Each test method is run with its synthesis helper replaced by one that records the
+    examples, so the benchmark always uses the same problems as the tests.
+    """
+    import test_part1
+    import test_part2
+    tasks = []
+
+    class ShapeTasks(test_part1.TestPart1Shapes):
+        def _test_synthesis(self, xs, ys, out, test_name):
+            tasks.append(Task(f"part1/{test_name}", 'shape', list(zip(xs.tolist(), ys.tolist(), out.tolist())), 3))
+
+    class StringTasks(test_part2.TestPart2Strings):
+        def _test_string_synthesis(self, examples, test_name):
+            tasks.append(Task(f"part2/{test_name}", 'string', list(examples), 5))
+
+    for recorder in (ShapeTasks, StringTasks):
+        for method in unittest.TestLoader().getTestCaseNames(recorder):
+            try:
+                getattr(recorder(method), method)()
+            except unittest.SkipTest:
+                pass
+    return tasks
+
+def sweep_tasks() -> List[Task]:
+    """Generated workloads of growing size: random points, more circles and more string examples"""
+    from test_part1 import random_test, multi_circle_test
+    tasks = []
+    for n_points in SWEEP_RANDOM_POINTS:
+        xs, ys, out = random_test(n_points, n_points)
+        tasks.append(Task(f"sweep/random_points_{n_points}", 'shape',
+                          list(zip(xs.tolist(), ys.tolist(), out.tolist())), 3))
+    for n_circles in range(1, len(SWEEP_CIRCLES) + 1):
+        xs, ys, out = multi_circle_test(*zip(*SWEEP_CIRCLES[:n_circles]))
+        tasks.append(Task(f"sweep/circles_{n_circles}", 'shape',
+                          list(zip(xs.tolist(), ys.tolist(), out.tolist())), 3))
+    for n_examples in SWEEP_STRING_EXAMPLES:
+        rng = random.Random(n_examples)
+        names = [(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)) for _ in range(n_examples)]
+        tasks.append(Task(f"sweep/first_name_{n_examples}", 'string',
+                          [(f"{first} {last}", first) for first, last in names], 5))
+    return tasks
+
+def run_task(task: Task, deadline: float, strategy: str = 'levels') -> Dict[str, Any]:
+    """Synthesize one task in this process and measure it"""
+    from enumerative_synthesis import peak_memory_mb, resident_memory_mb
+    if task.kind == 'shape':
+        from shape_synthesizer import ShapeSynthesizer
+        synthesizer = ShapeSynthesizer()
+    else:
+        from string_synthesizer import StringSynthesizer
+        synthesizer = StringSynthesizer()
+    counter = CandidateCounter()
+    synthesizer.observer = counter
+
+    start_memory = resident_memory_mb()
+    try:
+        # Start the peak from here, so the memory of imports and of loading the task is left out
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+    started = time.perf_counter()
+    try:
+        synthesizer.synthesize(task.examples, max_iterations=task.max_iterations, deadline=deadline,
+                               strategy=strategy)
+        status = 'solved' if synthesizer.stopped_by is None else 'stopped'
+    except ValueError:
+        status = 'unsolved'
+    except Exception as e:
+        status = f'error: {type(e).__name__}'
+    seconds = time.perf_counter() - started
+    return {'status': status, 'seconds': seconds, 'candidates': counter.candidates,
+            'programs_per_second': counter.candidates / seconds if seconds > 0 else 0.0,
+            'peak_memory_mb': max(0.0, peak_memory_mb() - start_memory),
+            'score': list(synthesizer.last_score) if synthesizer.last_score is not None else None}
+
+def _run_child(task: Task, deadline: float, strategy: str, connection) -> None:
+    connection.send(run_task(task, deadline, strategy))
+    connection.close()
+
+def measure(task: Task, repeats: int = 1, deadline: float = 30.0, strategy: str = 'levels') -> Dict[str, Any]:
+    """
+    Run a task `repeats` times, each in a fresh process, and keep the fastest run
+
+    A fresh process gives each run its own peak memory and a cold cache of interned
+    nodes. Runs that outlive the deadline by a wide margin are killed.
+    """
+    context = multiprocessing.get_context('spawn')
+    best = None
+    for _ in range(repeats):
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_run_child, args=(task, deadline, strategy, sender))
+        process.start()
+        sender.close()
+        if receiver.poll(2 * deadline + 30):
+            result = receiver.recv()
+        else:
+            result = {'status': 'timeout', 'seconds': 2 * deadline + 30, 'candidates': 0,
+                      'programs_per_second': 0.0, 'peak_memory_mb': 0.0, 'score': None}
+            process.terminate()
+        process.join()
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float = 0.25,
+            min_seconds: float = 0.05, min_memory_mb: float = 8.0) -> List[str]:
+    """
+    Regressions of results against the baseline, one message each
+
+    A task regresses when it no longer reaches a status it reached before, or when its time,
+    throughput or memory is worse by more than `tolerance`. Differences under `min_seconds`
+    and `min_memory_mb` are treated as noise.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if STATUS_RANK.get(result['status'], 0) < STATUS_RANK.get(base['status'], 0):
+            regressions.append(f"{name}: {base['status']} -> {result['status']}")
+            continue
+        if result['seconds'] > base['seconds'] * (1 + tolerance) and result['seconds'] - base['seconds'] > min_seconds:
+            regressions.append(f"{name}: time {base['seconds']:.3f}s -> {result['seconds']:.3f}s "
+                               f"(+{100 * (result['seconds'] / base['seconds'] - 1):.0f}%)")
+        if base['seconds'] > min_seconds and base['programs_per_second'] > 0 and \
+                result['programs_per_second'] * (1 + tolerance) < base['programs_per_second']:
+            regressions.append(f"{name}: throughput {base['programs_per_second']:.0f}/s -> "
+                               f"{result['programs_per_second']:.0f}/s")
+        if result['peak_memory_mb'] > base['peak_memory_mb'] * (1 + tolerance) and \
+                result['peak_memory_mb'] - base['peak_memory_mb'] > min_memory_mb:
+            regressions.append(f"{name}: memory {base['peak_memory_mb']:.1f}MB -> {result['peak_memory_mb']:.1f}MB")
+    return regressions
+
+def machine_info() -> Dict[str, str]:
+    """Where a baseline was recorded; timings only compare meaningfully on the same machine"""
+    return {'platform': platform.platform(), 'processor': platform.processor() or platform.machine(),
+            'python': platform.python_version(), 'numpy': np.__version__}
+
+def format_row(name: str, result: Dict[str, Any], base: Optional[Dict[str, Any]]) -> str:
+    """One line of the report: status, time (and change against the baseline), throughput and memory"""
+    change = ""
+    if base is not None and base['seconds'] > 0:
+        change = f"{100 * (result['seconds'] / base['seconds'] - 1):+.0f}%"
+    return (f"{name:<45} {result['status']:<10} {result['seconds']:>9.3f}s {change:>7} "
+            f"{result['programs_per_second']:>12.0f}/s {result['peak_memory_mb']:>8.1f}MB")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the synthesizers against a stored baseline")
+    parser.add_argument("--suite", choices=("all", "tests", "sweeps"), default="all")
+    parser.add_argument("-k", "--filter", default="", help="only run tasks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per task; the fastest is kept")
+    parser.add_argument("--deadline", type=float, default=30.0, help="synthesis budget per run, in seconds")
+    parser.add_argument("--strategy", choices=("levels", "best_first"), default="levels",
+                        help="search strategy passed to synthesize")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative slowdown reported as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results to the baseline file")
+    args = parser.parse_args(argv)
+
+    tasks = []
+    if args.suite in ("all", "tests"):
+        tasks += test_file_tasks()
+    if args.suite in ("all", "sweeps"):
+        tasks += sweep_tasks()
+    tasks = [task for task in tasks if args.filter in task.name]
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['tasks']
+
+    results = {}
+    for task in tasks:
+        # Other strategies are recorded under their own names, so each is compared with itself
+        name = task.name if args.strategy == "levels" else f"{task.name}@{args.strategy}"
+        results[name] = measure(task, args.repeats, args.deadline, args.strategy)
+        print(format_row(name, results[name], baseline.get(name)), flush=True)
+
+    if args.update_baseline:
+        # Tasks that were not run keep their recorded baseline
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({'machine': machine_info(), 'tasks': {**baseline, **results}}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(results)} tasks, {len(regressions)} regressions")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
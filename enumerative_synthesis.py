@@ -5,12 +5,196 @@ that works across different domain-specific languages.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Any, TypeVar, Generic, Generator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import count, islice
+import hashlib
+import heapq
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from typing import List, Tuple, Dict, Any, TypeVar, Generic, Generator, Optional, Iterable, Callable
 import numpy as np
-from tqdm import tqdm
+
+from observers import SynthesisObserver
+from program_library import ProgramLibrary
 
 T = TypeVar('T')  # Generic type for a DSL expression
 
+class LimitReached(Exception):
+    """Raised inside a synthesis run when a limit is reached while a level is being enumerated"""
+    
+    def __init__(self, limit: str):
+        super().__init__(limit)
+        self.limit = limit
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process in MB"""
+    try:
+        # VmHWM, unlike ru_maxrss, can be reset by writing 5 to /proc/self/clear_refs
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def resident_memory_mb() -> float:
+    """Resident memory of this process in MB (peak resident memory where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_memory_mb()
+
+def timed(items: Iterable[Any], metrics: Optional[Dict[str, Any]], phase: str) -> Iterable[Any]:
+    """Iterate items, adding the time spent producing each one to metrics[phase] if metrics is given"""
+    if metrics is None:
+        return items
+    return _timed(iter(items), metrics, phase)
+
+def _timed(items: Iterable[Any], metrics: Dict[str, Any], phase: str) -> Generator[Any, None, None]:
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(items)
+        except StopIteration:
+            metrics[phase] += time.perf_counter() - started
+            return
+        metrics[phase] += time.perf_counter() - started
+        yield item
+
+class ProgramStore:
+    """
+    Columnar program bank: one row per program, children referenced by id
+    
+    Row i holds the opcode, left and right child ids (NO_CHILD if absent), a parameter id
+    (e.g. a terminal index, NO_CHILD if unused), the program size and the packed signature
+    row. Indexing the store with an id returns that signature as bytes, so a store can take
+    the place of the signature cache in `BottomUpSynthesizer.synthesize`, which then runs
+    on ids and only builds the AST of the returned program.
+    """
+    
+    NO_CHILD = -1
+    COLUMNS = ('opcodes', 'lefts', 'rights', 'params', 'sizes', 'rows')
+    
+    def __init__(self, signature_words: int, capacity: int = 1024):
+        self.count = 0
+        self.opcodes = np.empty(capacity, dtype=np.int8)
+        self.lefts = np.empty(capacity, dtype=np.int32)
+        self.rights = np.empty(capacity, dtype=np.int32)
+        self.params = np.empty(capacity, dtype=np.int32)
+        self.sizes = np.empty(capacity, dtype=np.int32)
+        self.rows = np.empty((capacity, signature_words), dtype=np.uint64)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __getitem__(self, program_id: int) -> bytes:
+        return self.rows[program_id].tobytes()
+    
+    def __contains__(self, program_id: Any) -> bool:
+        return isinstance(program_id, (int, np.integer)) and 0 <= program_id < self.count
+    
+    def values(self) -> Generator[bytes, None, None]:
+        """Signatures of all stored programs, in id order"""
+        for program_id in range(self.count):
+            yield self[program_id]
+    
+    @property
+    def signatures(self) -> np.ndarray:
+        """(n_programs, signature_words) view of the stored signatures"""
+        return self.rows[:self.count]
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name)[:self.count].nbytes for name in self.COLUMNS)
+    
+    def append(self, opcode: int, size: int, signature: np.ndarray, left: int = NO_CHILD,
+               right: int = NO_CHILD, param: int = NO_CHILD) -> int:
+        """Add a program and return its id"""
+        if self.count == len(self.opcodes):
+            self._reserve(max(1, 2 * self.count))
+        program_id = self.count
+        self.opcodes[program_id] = opcode
+        self.lefts[program_id] = left
+        self.rights[program_id] = right
+        self.params[program_id] = param
+        self.sizes[program_id] = size
+        self.rows[program_id] = signature
+        self.count += 1
+        return program_id
+    
+    def program(self, program_id: int, build: Callable[[int, int, Optional[T], Optional[T]], T],
+                memo: Optional[Dict[int, T]] = None) -> T:
+        """
+        Reconstruct the AST of a stored program
+        
+        Args:
+            program_id: Id of the program
+            build: Called as build(opcode, param, left, right) with already built children (or None)
+            memo: Optional id -> AST map shared across calls, so common subterms are built once
+        """
+        memo = {} if memo is None else memo
+        if program_id not in memo:
+            left, right = self.lefts[program_id], self.rights[program_id]
+            memo[program_id] = build(int(self.opcodes[program_id]), int(self.params[program_id]),
+                                     None if left == self.NO_CHILD else self.program(left, build, memo),
+                                     None if right == self.NO_CHILD else self.program(right, build, memo))
+        return memo[program_id]
+    
+    def carry(self, source: 'ProgramStore', ids: np.ndarray, renumber: np.ndarray) -> np.ndarray:
+        """
+        Append copies of rows of another store and return their ids here
+        
+        renumber maps source ids to ids here, with one slot per source row and a last one
+        holding NO_CHILD, and is updated with the copied rows. Children must be copied
+        before their parents.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.count + len(ids) > len(self.opcodes):
+            self._reserve(max(2 * len(self.opcodes), self.count + len(ids)))
+        copied = np.arange(self.count, self.count + len(ids))
+        renumber[ids] = copied
+        for name in ('opcodes', 'params', 'sizes', 'rows'):
+            getattr(self, name)[copied] = getattr(source, name)[ids]
+        self.lefts[copied] = renumber[source.lefts[ids]]
+        self.rights[copied] = renumber[source.rights[ids]]
+        self.count += len(ids)
+        return copied
+    
+    def save(self, path: str):
+        """Write each column to path as <column>.npy"""
+        for name in self.COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name)[:self.count])
+    
+    @classmethod
+    def load(cls, path: str, count: Optional[int] = None) -> 'ProgramStore':
+        """
+        Memory-map a store written by `save`, keeping its first count programs
+        
+        The columns stay on disk until the first append, which copies them into memory.
+        """
+        store = cls.__new__(cls)
+        for name in cls.COLUMNS:
+            setattr(store, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')[:count])
+        store.count = len(store.opcodes)
+        return store
+    
+    def _reserve(self, capacity: int):
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.empty((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
 class BottomUpSynthesizer(ABC, Generic[T]):
     """Abstract base class for bottom-up enumerative synthesizers"""
     
@@ -20,8 +204,13 @@ class BottomUpSynthesizer(ABC, Generic[T]):
         pass
     
     @abstractmethod
-    def grow(self, program_list: List[T], examples: List[Any]) -> List[T]:
-        """Grow the program list by one level using all possible operations"""
+    def grow(self, program_list: List[T], examples: List[Any]) -> Iterable[T]:
+        """
+        Grow the program list by one level using all possible operations
+        
+        May return a generator; candidates should come smallest first, so that
+        `synthesize` can stop as soon as a correct one appears.
+        """
         pass
     
     @abstractmethod
@@ -29,66 +218,708 @@ class BottomUpSynthesizer(ABC, Generic[T]):
         """Check if a program produces the expected output on all examples"""
         pass
     
-    def synthesize(self, examples: List[Any], max_iterations: int = 5) -> T:
+    # Process pool used by the grow hooks while `synthesize` runs with workers > 1
+    pool: Optional[ProcessPoolExecutor] = None
+    workers: int = 1
+    # Number of candidates fingerprinted per round trip to the process pool
+    parallel_window: int = 2**16
+    # Indices of the examples that most recently rejected a candidate, most recent first
+    counterexamples: List[int] = []
+    # How many recent counterexamples `is_correct` tries before the full comparison
+    counterexample_window: int = 4
+    # Programs added to the bank between two checks of the deadline and memory limits
+    limit_check_interval: int = 1024
+    # Monotonic time at which the running `synthesize` call's deadline passes, None without one
+    deadline_at: Optional[float] = None
+    # (misclassified examples, size) of the program the last `synthesize` call returned
+    last_score: Optional[Tuple[int, int]] = None
+    # Which limit stopped the last `synthesize` call early, or None if it ran to completion
+    stopped_by: Optional[str] = None
+    # Receives per-iteration metrics from `synthesize`; None disables instrumentation
+    observer: Optional[SynthesisObserver] = None
+    # Metrics of the iteration in progress while an observer is attached, else None
+    metrics: Optional[Dict[str, Any]] = None
+    # Programs of earlier tasks, checked before enumerating and extended with every solution
+    library: Optional[ProgramLibrary] = None
+    # Search strategies `synthesize` can run
+    STRATEGIES: Tuple[str, ...] = ('levels', 'best_first')
+    # Weight of `distance` against program size in the best-first priority
+    best_first_weight: float = 1.0
+    # Values derived from the examples while a synthesis run is in progress, None outside one
+    run_cache: Optional[Dict[str, Any]] = None
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Synthesizers are shipped to pool workers; the pool itself stays in the parent
+        state = self.__dict__.copy()
+        state.pop('pool', None)
+        # Workers do not report metrics or consult the library, and an observer may hold an open file
+        state.pop('observer', None)
+        state.pop('metrics', None)
+        state.pop('library', None)
+        state.pop('run_cache', None)
+        return state
+    
+    @contextmanager
+    def synthesis_run(self) -> Generator[None, None, None]:
         """
-        Main synthesis algorithm using bottom-up enumeration
+        Scope of one synthesis run, inside which `run_cache` is available
         
+        The examples cannot change while a run is in progress, so values derived from them
+        can be cached in it; the cache is dropped when the run ends, so a later run never
+        sees values of examples the caller has since modified. Nested runs, such as the
+        rounds of `synthesize_cegis`, share the cache of the outermost one.
+        """
+        if self.run_cache is not None:
+            yield
+            return
+        self.run_cache = {}
+        try:
+            yield
+        finally:
+            self.run_cache = None
+            self.deadline_at = None
+    
+    def synthesize(self, examples: List[Any], max_iterations: int = 5, workers: int = 1,
+                   checkpoint_dir: Optional[str] = None, deadline: Optional[float] = None,
+                   max_programs: Optional[int] = None, max_memory_mb: Optional[float] = None,
+                   strategy: str = 'levels') -> T:
+        """
+        Main synthesis algorithm using bottom-up enumeration
+
+        With a `library` attached, its programs are checked against the examples first, and
+        enumeration only runs if none satisfies them all; a program enumeration finds is added
+        to the library. After every iteration, the attached `observer` (if any) receives that
+        iteration's metrics.
+        The limits make synthesis anytime: they are checked as programs enter the bank, and
+        the deadline also while candidates are enumerated (`check_deadline`), so a level
+        that yields few new programs still stops on time. The first limit reached stops the
+        run, which then returns the best program enumerated so far instead of raising. Its
+        score is left in `last_score` and the limit that was reached in `stopped_by`.
+
         Args:
             examples: List of input-output examples
             max_iterations: Maximum number of growth iterations
-            
+            workers: Number of worker processes used to grow and fingerprint candidates
+            checkpoint_dir: If given, the bank is saved there after every completed level and
+                a later run on the same examples and configuration resumes from the deepest one
+            deadline: Wall-clock budget in seconds
+            max_programs: Maximum number of programs in the bank
+            max_memory_mb: Maximum resident memory of this process in MB
+            strategy: 'levels' to grow the bank level by level, or 'best_first' to expand programs
+                in order of size plus heuristic (see `search_best_first`)
+
         Returns:
-            A program that satisfies all examples
+            A program that satisfies all examples, or the best one found when a limit is reached
         """
-        
+
         if not examples:
             raise ValueError("No examples provided")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {self.STRATEGIES}")
+        if strategy == 'best_first':
+            if checkpoint_dir is not None:
+                raise ValueError("Checkpoints are only written by the 'levels' strategy")
+            if type(self).expand is BottomUpSynthesizer.expand:
+                raise ValueError(f"{type(self).__name__} does not support best-first search")
+        with self.synthesis_run():
+            started = time.monotonic()
+            self.last_score, self.stopped_by = None, None
+            self.deadline_at = None if deadline is None else started + deadline
+            if self.library is not None:
+                program = self.library.lookup(self, examples)
+                if program is not None:
+                    return self.solution(program)
+            if strategy == 'best_first':
+                return self.search_best_first(examples, max_iterations, started, deadline, max_programs, max_memory_mb)
+            test_inputs = self.extract_test_inputs(examples)
+            target = self.target_signature(examples, test_inputs)
+
+            cache = self.create_cache(test_inputs)
+            program_list: List[T] = []
+            self.counterexamples = []
+
+            # Bank size after each completed level; levels restored from a checkpoint are not redone
+            levels: List[int] = []
+            checkpoint = None
+            if checkpoint_dir is not None:
+                checkpoint = os.path.join(checkpoint_dir, self.checkpoint_key(examples))
+                resumed = self.load_checkpoint(checkpoint, test_inputs, max_iterations)
+                if resumed is not None:
+                    program_list, cache, levels = resumed
+
+            self.workers = workers
+            self.pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+            try:
+                for iteration in range(len(levels), max_iterations + 1):
+                    metrics = self.metrics = None if self.observer is None else self.start_metrics(iteration, program_list)
+                    try:
+                        if iteration == 0:
+                            unique_programs = self.unique_terminals(examples, test_inputs, cache)
+                        elif iteration == max_iterations:
+                            unique_programs = self.grow_final(program_list, examples, test_inputs, cache, iteration)
+                        else:
+                            unique_programs = self.grow_unique(program_list, examples, test_inputs, cache, iteration)
+
+                        self.stopped_by = self.limit_reached(started, program_list, deadline, max_programs, max_memory_mb)
+                        if self.stopped_by is not None:
+                            return self.best_so_far(program_list, examples, cache)
+                        for program in unique_programs:
+                            if metrics is not None:
+                                checking = time.perf_counter()
+                            if target is not None:
+                                correct = self.equivalence_key(cache[program]) == target
+                            else:
+                                correct = self.is_correct(self.materialize(program, cache), examples)
+                            if metrics is not None:
+                                metrics['check_seconds'] += time.perf_counter() - checking
+                            if correct:
+                                return self.solution(self.remember(self.materialize(program, cache)))
+                            program_list.append(program)
+                            if max_programs is not None and len(program_list) >= max_programs or \
+                                    len(program_list) % self.limit_check_interval == 0:
+                                self.stopped_by = self.limit_reached(started, program_list, deadline,
+                                                                     max_programs, max_memory_mb)
+                                if self.stopped_by is not None:
+                                    return self.best_so_far(program_list, examples, cache)
+                    except LimitReached as reached:
+                        self.stopped_by = reached.limit
+                        return self.best_so_far(program_list, examples, cache)
+                    finally:
+                        if metrics is not None:
+                            self.observer.on_iteration(self.finish_metrics(metrics, program_list, cache))
+
+                    # The final level may be searched rather than enumerated, so only earlier ones are saved
+                    if checkpoint is not None and iteration < max_iterations:
+                        levels.append(len(program_list))
+                        self.save_checkpoint(checkpoint, program_list, cache, levels)
+            finally:
+                self.metrics = None
+                if self.pool is not None:
+                    self.pool.shutdown(cancel_futures=True)
+                    self.pool = None
+
+            raise ValueError(f"No program found within {max_iterations} iterations")
+    
+    def search_best_first(self, examples: List[Any], max_iterations: int, started: float,
+                          deadline: Optional[float] = None, max_programs: Optional[int] = None,
+                          max_memory_mb: Optional[float] = None) -> T:
+        """
+        Best-first enumeration: `synthesize` with strategy='best_first'
+        
+        Candidates wait in a priority queue ordered by size plus `best_first_weight` times
+        `distance` from their signature to the target. The most promising one enters the bank
+        and is combined with every bank entry at once (`expand`), so a deep solution built
+        from promising parts is reached without finishing the levels below it. Equivalence
+        elimination still applies: a signature is queued at most once per smaller size and
+        only its first program to leave the queue enters the bank. `max_iterations` bounds
+        program size to what that many levels can build, 2^(max_iterations + 1) - 1 nodes.
+        The observer receives a single record covering the whole search, as iteration 0.
+        """
         test_inputs = self.extract_test_inputs(examples)
+        target = self.target_signature(examples, test_inputs)
+        max_size = 2 ** (max_iterations + 1) - 1
+        # The queue holds programs, so the bank is never columnar here
+        cache: Dict[T, Any] = {}
+        program_list: List[T] = []
+        self.counterexamples = []
+        
+        # (priority, size, tie-breaker, program, signature); the tie-breaker keeps insertion order
+        queue: List[Tuple[float, int, int, T, Any]] = []
+        order = count()
+        # Smallest queued size of every equivalence key, and the keys already in the bank
+        queued: Dict[Any, int] = {}
+        seen = set()
         
-        ###################################################################################################
-        #                                                                                                 #
-        # Part 1 (c): Synthesizing Geometric Shapes (`synthesize`)                                        #
-        #                                                                                                 #
-        # TODO: Add your implementation here.                                                             #
-        #                                                                                                 #
-        # NOTE: Add code above the below raise statement and implement the actual synthesis logic here.   #
-        #       Make sure to keep the raise statement at the end of the function, which should be reached #
-        #       if no program is found within the given number of iterations.                             #
-        #                                                                                                 #
-        ###################################################################################################
+        def offer(program: T, signature: Any = None) -> bool:
+            """Queue a candidate unless it is equivalent to a smaller queued or banked one; True if correct"""
+            size = program.size()
+            if size > max_size:
+                return False
+            if signature is None:
+                if metrics is not None:
+                    metrics['candidates'] += 1
+                    computing = time.perf_counter()
+                signature = self.derive_signature(program, cache)
+                if signature is None:
+                    signature = self.compute_signature(program, test_inputs)
+                if metrics is not None:
+                    metrics['signature_seconds'] += time.perf_counter() - computing
+            if signature is None:
+                return False
+            key = self.equivalence_key(signature)
+            if key in seen or queued.get(key, max_size + 1) <= size:
+                return False
+            if metrics is not None:
+                checking = time.perf_counter()
+            if target is not None:
+                correct = key == target
+            else:
+                correct = self.is_correct(program, examples)
+            if metrics is not None:
+                metrics['check_seconds'] += time.perf_counter() - checking
+            if correct:
+                return True
+            queued[key] = size
+            priority = size + self.best_first_weight * self.distance(signature, target, examples)
+            heapq.heappush(queue, (priority, size, next(order), program, signature))
+            return False
         
+        metrics = self.metrics = None if self.observer is None else self.start_metrics(0, program_list)
+        try:
+            # Terminals are deduplicated in bulk into a scratch cache and then queued like any candidate
+            terminals: Dict[T, Any] = {}
+            for terminal in self.unique_terminals(examples, test_inputs, terminals):
+                if offer(terminal, terminals[terminal]):
+                    return self.solution(self.remember(terminal))
+            for popped in count():
+                if not queue:
+                    break
+                if max_programs is not None and len(program_list) >= max_programs or \
+                        popped % self.limit_check_interval == 0:
+                    self.stopped_by = self.limit_reached(started, program_list, deadline, max_programs, max_memory_mb)
+                    if self.stopped_by is not None:
+                        return self.best_so_far(program_list, examples, cache)
+                _, size, _, program, signature = heapq.heappop(queue)
+                key = self.equivalence_key(signature)
+                if key in seen:
+                    continue
+                seen.add(key)
+                cache[program] = signature
+                program_list.append(program)
+                for candidate in self.expand(program, program_list, examples):
+                    if offer(candidate):
+                        return self.solution(self.remember(candidate))
+                    self.check_deadline()
+        except LimitReached as reached:
+            self.stopped_by = reached.limit
+            return self.best_so_far(program_list, examples, cache)
+        finally:
+            if metrics is not None:
+                self.observer.on_iteration(self.finish_metrics(metrics, program_list, cache))
+            self.metrics = None
         raise ValueError(f"No program found within {max_iterations} iterations")
     
-    def eliminate_equivalents(self, program_list: List[T], test_inputs: List[Any], 
-                              cache: Dict[T, Any], iteration: int) -> Generator[T, None, Dict[T, Any]]:
+    def expand(self, program: T, program_list: List[T], examples: List[Any]) -> Iterable[T]:
+        """
+        Every program one operator above `program`, combining it with itself or a bank entry
+        
+        program_list is the bank, which already holds `program`; used by the best-first strategy.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support best-first search")
+    
+    def distance(self, signature: Any, target: Any, examples: List[Any]) -> float:
+        """How far a signature is from the target, the best-first heuristic; 0 orders candidates by size alone"""
+        return 0.0
+    
+    def remember(self, program: T) -> T:
+        """Add a program that satisfies every example to the attached library, if any, and return it"""
+        if self.library is not None:
+            self.library.add(self, program)
+        return program
+    
+    def start_metrics(self, iteration: int, program_list: List[Any]) -> Dict[str, Any]:
+        """Fresh metrics record for an iteration; the counters and timers fill in while it runs"""
+        return {'iteration': iteration, 'candidates': 0, 'unique': 0, 'duplicates': 0, 'grow_seconds': 0.0,
+                'signature_seconds': 0.0, 'check_seconds': 0.0, 'bank_programs': 0, 'bank_bytes': 0,
+                'peak_rss_mb': 0.0, 'solved': False, 'stopped_by': None,
+                '_started': time.perf_counter(), '_bank_start': len(program_list)}
+    
+    def finish_metrics(self, metrics: Dict[str, Any], program_list: List[Any], cache: Any) -> Dict[str, Any]:
+        """Complete an iteration's record once its programs are in the bank or the run has ended"""
+        elapsed = time.perf_counter() - metrics.pop('_started')
+        metrics['solved'] = self.stopped_by is None and self.last_score is not None
+        # A correct program is checked but never added to the bank
+        metrics['unique'] = len(program_list) - metrics.pop('_bank_start') + metrics['solved']
+        metrics['duplicates'] = max(0, metrics['candidates'] - metrics['unique'])
+        metrics['grow_seconds'] = max(0.0, elapsed - metrics['signature_seconds'] - metrics['check_seconds'])
+        metrics['bank_programs'] = len(program_list)
+        metrics['bank_bytes'] = self.bank_nbytes(program_list, cache)
+        metrics['peak_rss_mb'] = peak_memory_mb()
+        metrics['stopped_by'] = self.stopped_by
+        return metrics
+    
+    def bank_nbytes(self, program_list: List[Any], cache: Any) -> int:
+        """Bytes held by the bank's signatures"""
+        if isinstance(cache, ProgramStore):
+            return cache.nbytes
+        return sum(sys.getsizeof(cache[program]) for program in program_list)
+    
+    def limit_reached(self, started: float, program_list: List[Any], deadline: Optional[float],
+                      max_programs: Optional[int], max_memory_mb: Optional[float]) -> Optional[str]:
+        """Name of the first `synthesize` limit that has been reached, or None"""
+        if max_programs is not None and len(program_list) >= max_programs:
+            return 'max_programs'
+        if deadline is not None and time.monotonic() - started >= deadline:
+            return 'deadline'
+        if max_memory_mb is not None and resident_memory_mb() >= max_memory_mb:
+            return 'max_memory_mb'
+        return None
+    
+    def check_deadline(self) -> None:
+        """
+        Raise `LimitReached` once the running `synthesize` call is past its deadline
+        
+        Called for every candidate, or block of candidates, while a level is enumerated;
+        the bank-size and memory limits are only checked as programs enter the bank.
+        """
+        if self.deadline_at is not None and time.monotonic() >= self.deadline_at:
+            raise LimitReached('deadline')
+    
+    def solution(self, program: T) -> T:
+        """Record the score of a program that satisfies every example and return it"""
+        self.last_score = (0, program.size())
+        return program
+    
+    def best_so_far(self, program_list: List[Any], examples: List[Any], cache: Any) -> T:
+        """Return the best program of a bank cut short by a limit, recording its score"""
+        if not program_list:
+            raise ValueError(f"Reached the {self.stopped_by} limit before any program was enumerated")
+        program, self.last_score = self.best_program(program_list, examples, cache)
+        return program
+    
+    def best_program(self, program_list: List[Any], examples: List[Any], cache: Any) -> Tuple[T, Tuple[int, int]]:
+        """
+        The bank entry with the fewest misclassified examples, smaller programs breaking ties
+        
+        Returns the program and its score, (misclassified examples, size). Subclasses can score
+        the whole bank from the cached signatures instead of running every program again.
+        """
+        best, best_score = None, None
+        for entry in program_list:
+            program = self.materialize(entry, cache)
+            score = (len(self.failing_examples(program, examples)), program.size())
+            if best_score is None or score < best_score:
+                best, best_score = program, score
+        return best, best_score
+    
+    def synthesize_cegis(self, examples: List[Any], max_iterations: int = 5, workers: int = 1,
+                         initial_examples: int = 32, counterexamples_per_round: int = 4,
+                         checkpoint_dir: Optional[str] = None) -> T:
+        """
+        Counterexample-guided synthesis for large example sets
+        
+        Runs `synthesize` on a small working subset of the examples, checks the result
+        against the full set in one pass of `failing_examples`, adds a few of the failing
+        examples to the subset and repeats. Enumeration cost depends on the size of the
+        working subset rather than on the number of examples. Each round re-enumerates on the
+        grown subset: bank levels are built from the equivalence classes of the level below,
+        so once a class splits, every level above it has to be grown again. An attached
+        `library` is consulted once, on all examples, and is only given the final program.
+        
+        Args:
+            examples: List of input-output examples
+            max_iterations: Maximum number of growth iterations per round
+            workers: Number of worker processes used to grow and fingerprint candidates
+            initial_examples: Size of the first working subset, spread evenly over the examples
+            counterexamples_per_round: Maximum number of failing examples added per round
+            checkpoint_dir: Passed to `synthesize` for every round
+        
+        Returns:
+            A program that satisfies all examples
+        """
+        if not examples:
+            raise ValueError("No examples provided")
+        if len(examples) <= initial_examples:
+            return self.synthesize(examples, max_iterations, workers, checkpoint_dir)
+        
+        working = sorted(set(np.linspace(0, len(examples) - 1, initial_examples).astype(int).tolist()))
+        with self.synthesis_run():
+            if self.library is not None:
+                program = self.library.lookup(self, examples)
+                if program is not None:
+                    return self.solution(program)
+            # Round solutions only satisfy a subset, so the library is only given the verified final program
+            library, self.library = self.library, None
+            try:
+                while True:
+                    # A subset with no solution means the full set has none either, so ValueError propagates
+                    program = self.synthesize([examples[i] for i in working], max_iterations, workers, checkpoint_dir)
+                    failing = self.failing_examples(program, examples)
+                    if not failing:
+                        break
+                    # The program satisfies the working subset, so every failing example is new to it
+                    picks = np.linspace(0, len(failing) - 1, min(counterexamples_per_round, len(failing))).astype(int)
+                    working = sorted(set(working).union(failing[i] for i in picks))
+            finally:
+                self.library = library
+            return self.remember(program)
+    
+    def failing_examples(self, program: T, examples: List[Any]) -> List[int]:
+        """Indices of the examples the program gets wrong, used to verify CEGIS candidates"""
+        raise NotImplementedError(f"{type(self).__name__} does not support counterexample-guided synthesis")
+    
+    def library_domain(self) -> str:
+        """Name of the group of library programs this synthesizer can reuse"""
+        return type(self).__qualname__
+    
+    def fingerprint(self, program: T) -> bytes:
+        """The program's outputs on a fixed probe set, identifying it semantically in a `ProgramLibrary`"""
+        raise NotImplementedError(f"{type(self).__name__} does not support a program library")
+    
+    def library_matches(self, programs: List[T], examples: List[Any]) -> np.ndarray:
+        """Boolean mask of the programs that satisfy every example; subclasses can check them in one batch"""
+        return np.array([self.is_correct(program, examples) for program in programs], dtype=bool)
+    
+    def example_order(self, n_examples: int) -> List[int]:
+        """Example indices with the recent counterexamples first, so failing candidates are rejected early"""
+        recent = [index for index in self.counterexamples if index < n_examples]
+        return recent + [index for index in range(n_examples) if index not in recent]
+    
+    def note_counterexample(self, index: int) -> None:
+        """Record that the example at index rejected a candidate"""
+        recent = [other for other in self.counterexamples if other != index]
+        self.counterexamples = [index] + recent[:self.counterexample_window - 1]
+    
+    # Attributes that do not change what a run enumerates, left out of the checkpoint key
+    checkpoint_ignore: Tuple[str, ...] = ('pool', 'workers', 'parallel_window', 'counterexamples',
+                                          'counterexample_window', 'limit_check_interval', 'last_score',
+                                          'stopped_by', 'best_first_weight', 'deadline_at')
+    
+    def checkpoint_key(self, examples: List[Any]) -> str:
+        """Name of the checkpoint for these examples: a hash of them and of the synthesizer configuration"""
+        config = {name: value for name, value in sorted(vars(self).items())
+                  if not name.startswith('_') and name not in self.checkpoint_ignore
+                  and isinstance(value, (bool, int, float, str, tuple, list))}
+        digest = hashlib.sha256(type(self).__qualname__.encode())
+        digest.update(repr(config).encode())
+        digest.update(pickle.dumps(examples, protocol=4))
+        return digest.hexdigest()[:24]
+    
+    def save_checkpoint(self, checkpoint: str, program_list: List[Any], cache: Any, levels: List[int]) -> None:
+        """Write the bank after len(levels) completed levels and drop the shallower checkpoints"""
+        depth = len(levels)
+        level_dir = os.path.join(checkpoint, f"level-{depth}")
+        # Written next to the final location and renamed, so an interrupted save leaves no partial level
+        staging = level_dir + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        self.save_bank(staging, program_list, cache)
+        with open(os.path.join(staging, "levels.json"), "w") as f:
+            json.dump(levels, f)
+        shutil.rmtree(level_dir, ignore_errors=True)
+        os.replace(staging, level_dir)
+        for name in os.listdir(checkpoint):
+            if name.startswith("level-") and name[len("level-"):].isdigit() and int(name[len("level-"):]) < depth:
+                shutil.rmtree(os.path.join(checkpoint, name), ignore_errors=True)
+    
+    def load_checkpoint(self, checkpoint: str, test_inputs: List[Any],
+                        max_iterations: int) -> Optional[Tuple[List[Any], Any, List[int]]]:
+        """
+        Restore the bank from the deepest saved level
+        
+        Levels only ever append to the bank, so a deeper checkpoint is cut back to the first
+        max_iterations levels, leaving the final level to be searched as usual.
+        
+        Returns:
+            (program_list, cache, levels), or None if there is nothing to resume from
+        """
+        if not os.path.isdir(checkpoint):
+            return None
+        depths = [int(name[len("level-"):]) for name in os.listdir(checkpoint)
+                  if name.startswith("level-") and name[len("level-"):].isdigit()]
+        if not depths:
+            return None
+        level_dir = os.path.join(checkpoint, f"level-{max(depths)}")
+        with open(os.path.join(level_dir, "levels.json")) as f:
+            levels = json.load(f)[:max_iterations]
+        if not levels:
+            return None
+        program_list, cache = self.load_bank(level_dir, test_inputs, levels[-1])
+        return program_list, cache, levels
+    
+    def save_bank(self, path: str, program_list: List[Any], cache: Any) -> None:
+        """Write the bank to the directory path: pickled programs and a .npy signature matrix"""
+        with open(os.path.join(path, "programs.pkl"), "wb") as f:
+            pickle.dump(program_list, f, protocol=pickle.HIGHEST_PROTOCOL)
+        np.save(os.path.join(path, "signatures.npy"), self.signature_rows([cache[p] for p in program_list]))
+    
+    def load_bank(self, path: str, test_inputs: List[Any], count: int) -> Tuple[List[Any], Any]:
+        """Read the first count programs of a bank written by `save_bank`, memory-mapping the signatures"""
+        with open(os.path.join(path, "programs.pkl"), "rb") as f:
+            program_list = pickle.load(f)[:count]
+        rows = np.load(os.path.join(path, "signatures.npy"), mmap_mode="r")
+        cache = self.create_cache(test_inputs)
+        for program, row in zip(program_list, rows):
+            cache[program] = self.signature_from_row(row)
+        return program_list, cache
+    
+    def signature_rows(self, signatures: List[Any]) -> np.ndarray:
+        """Signatures as the rows of one array, for saving as .npy"""
+        return np.asarray(signatures)
+    
+    def signature_from_row(self, row: np.ndarray) -> Any:
+        """Inverse of `signature_rows` for a single row"""
+        return tuple(row.tolist())
+    
+    def create_cache(self, test_inputs: List[Any]) -> Any:
+        """
+        Create the signature cache for one synthesis run
+        
+        The cache maps each bank entry to its signature. By default entries are programs
+        and the cache is a dict; a subclass may return a `ProgramStore`, in which case bank
+        entries are program ids and `materialize` turns the result back into a program.
+        """
+        return {}
+    
+    def materialize(self, program: Any, cache: Any) -> T:
+        """Turn a bank entry into a program (the identity unless bank entries are ids)"""
+        return program
+    
+    def extend_bank(self, examples: List[Any], test_inputs: List[Any], levels: List[List[Any]],
+                    cache: Any) -> Optional[Tuple[List[Any], Any, Optional[int]]]:
+        """
+        Extend a bank built on the test inputs of examples[:-1] to all of examples
+        
+        levels holds the bank entries found at each level. Used by `SynthesisSession`; the
+        default returns None, in which case the session searches again from scratch.
+        
+        Returns:
+            (test_inputs, cache, lowest): the test inputs of all examples, a cache holding the
+            bank entries with their signatures extended to them, and the lowest level above
+            the terminals whose classes may have split, or None if no signature changed
+        """
+        return None
+    
+    def carry_over(self, programs: List[Any], source: Any, cache: Any) -> List[Any]:
+        """
+        Copy bank entries and their signatures from the cache source into cache
+        
+        Used by `SynthesisSession` to rebuild its cache level by level; entries are carried
+        over after their children. Returns the entries as they are known in cache.
+        """
+        for program in programs:
+            cache[program] = source[program]
+        return list(programs)
+    
+    def eliminate_equivalents(self, program_list: Iterable[T], test_inputs: List[Any], 
+                              cache: Dict[T, Any], iteration: int,
+                              signatures: Optional[List[Any]] = None) -> Generator[T, None, Dict[T, Any]]:
         """
         Eliminate equivalent programs while maintaining interpretation cache
         
+        Programs already in the cache, programs that fail to interpret and programs
+        whose equivalence key matches a cached one are skipped. `signatures` can hold
+        precomputed signatures aligned with `program_list` (None entries are computed).
+        
         Yields:
             Unique programs one at a time
             
         Returns:
             Updated cache after processing all programs
         """
-        
-        ###################################################################################################
-        #                                                                                                 #
-        # Part 1 (b): Synthesizing Geometric Shapes (`eliminate_equivalents`)                             #
-        #                                                                                                 #
-        # TODO: Add your implementation here.                                                             #
-        #                                                                                                 #
-        # NOTE: Below is a placeholder implementation that does not eliminate observationally             #
-        #       equivalent programs. You need to implement the actual elimination logic here.             #
-        #       Unique programs should be yielded one at a time.                                          #
-        #                                                                                                 #
-        # NOTE: We use tqdm to show a progress bar. You can remove it or keep using it to show the        #
-        #       progress of the synthesis process. You can also use it to show the progress of the        #
-        #       other processes during the synthesis process.                                             #
-        #                                                                                                 #
-        ###################################################################################################
-        
-        for program in tqdm(program_list, desc=f"[Iteration {iteration}] Processing programs and eliminating equivalents", unit="program"):
+        seen = {self.equivalence_key(signature) for signature in cache.values()}
+        metrics = self.metrics
+        for position, program in enumerate(program_list):
+            self.check_deadline()
+            if program in cache:
+                continue
+            if metrics is not None:
+                metrics['candidates'] += 1
+                computing = time.perf_counter()
+            signature = signatures[position] if signatures is not None else None
+            if signature is None:
+                signature = self.derive_signature(program, cache)
+            if signature is None:
+                signature = self.compute_signature(program, test_inputs)
+            if metrics is not None:
+                metrics['signature_seconds'] += time.perf_counter() - computing
+            if signature is None:
+                continue
+            key = self.equivalence_key(signature)
+            if key in seen:
+                continue
+            seen.add(key)
+            cache[program] = signature
             yield program
+        return cache
+    
+    def grow_unique(self, program_list: List[T], examples: List[Any], test_inputs: List[Any],
+                    cache: Dict[T, Any], iteration: int) -> Generator[T, None, Dict[T, Any]]:
+        """
+        Grow the program list by one level and yield only the observationally unique new programs
+        
+        Subclasses can override this to fuse growing and elimination. With a process pool,
+        signatures are computed by the workers window by window and merged back in
+        candidate order, so the surviving programs are the same as in a serial run.
+        """
+        candidates = self.grow(program_list, examples)
+        if self.pool is None:
+            return (yield from self.eliminate_equivalents(candidates, test_inputs, cache, iteration))
+        
+        # Work through the level in windows so a correct program still ends the search early
+        candidates = iter(candidates)
+        while window := list(islice(candidates, self.parallel_window)):
+            computing = time.perf_counter()
+            signatures = self.parallel_signatures(window, test_inputs, cache)
+            if self.metrics is not None:
+                self.metrics['signature_seconds'] += time.perf_counter() - computing
+            yield from self.eliminate_equivalents(window, test_inputs, cache, iteration, signatures)
+        return cache
+    
+    def parallel_signatures(self, programs: List[T], test_inputs: List[Any], cache: Dict[T, Any]) -> List[Any]:
+        """
+        Signatures for a window of candidates, aligned with `programs`
+        
+        Signatures that can be derived from the cache are derived locally; the rest are
+        computed by the process pool in chunks. Cached programs get None.
+        """
+        signatures = [None if program in cache else self.derive_signature(program, cache) for program in programs]
+        pending = [position for position, program in enumerate(programs)
+                   if signatures[position] is None and program not in cache]
+        chunk_size = max(1, -(-len(pending) // (4 * self.workers)))
+        chunks = [[programs[position] for position in pending[start:start + chunk_size]]
+                  for start in range(0, len(pending), chunk_size)]
+        computed = self.pool.map(compute_signatures, [self] * len(chunks), chunks, [test_inputs] * len(chunks))
+        for position, signature in zip(pending, (signature for chunk in computed for signature in chunk)):
+            signatures[position] = signature
+        return signatures
+    
+    def grow_final(self, program_list: List[T], examples: List[Any], test_inputs: List[Any],
+                   cache: Dict[T, Any], iteration: int) -> Generator[T, None, Dict[T, Any]]:
+        """
+        Grow the last level, whose programs are never grown further
+        
+        Only correct programs matter here, so subclasses can override this to search
+        for them directly instead of enumerating the whole level.
+        """
+        return (yield from self.grow_unique(program_list, examples, test_inputs, cache, iteration))
+    
+    def derive_signature(self, program: T, cache: Dict[T, Any]) -> Any:
+        """
+        Compute a program's signature from the cached signatures of its children
+        
+        Returns None when the signature cannot be derived, in which case it is computed
+        by interpreting the program with `compute_signature`.
+        """
+        return None
+    
+    def unique_terminals(self, examples: List[Any], test_inputs: List[Any],
+                         cache: Dict[T, Any]) -> Generator[T, None, Dict[T, Any]]:
+        """
+        Yield observationally unique terminals, recording their signatures in the cache
+        
+        Subclasses can override this to evaluate terminals in bulk.
+        """
+        return (yield from self.eliminate_equivalents(self.generate_terminals(examples), test_inputs, cache, 0))
+    
+    def equivalence_key(self, signature: Any) -> Any:
+        """
+        Part of a signature that decides observational equivalence and correctness
+        
+        Signatures may carry extra information that helps derive the signatures of
+        larger programs. Defaults to the whole signature.
+        """
+        return signature
+    
+    def target_signature(self, examples: List[Any], test_inputs: List[Any]) -> Any:
+        """
+        Signature that a correct program must have on the test inputs
+        
+        When this returns a value, `synthesize` checks correctness by comparing the
+        equivalence keys of cached signatures against it instead of calling `is_correct`.
+        Returns None by default.
+        """
+        return None
     
     @abstractmethod
     def extract_test_inputs(self, examples: List[Any]) -> List[Any]:
@@ -99,3 +930,164 @@ class BottomUpSynthesizer(ABC, Generic[T]):
     def compute_signature(self, program: T, test_inputs: List[Any]) -> Any:
         """Compute a signature for a program on test inputs for equivalence checking"""
         pass
+
+def compute_signatures(synthesizer: BottomUpSynthesizer[T], programs: List[T], test_inputs: List[Any]) -> List[Any]:
+    """Compute the signatures of a chunk of programs (runs in pool workers)"""
+    return [synthesizer.compute_signature(program, test_inputs) for program in programs]
+
+class SynthesisSession(Generic[T]):
+    """
+    Synthesis over an example set that grows one example at a time, as in interactive labelling
+    
+    The session keeps the current program, and between searches the test inputs, the
+    signature cache and the bank, level by level. A new example that the program already
+    gets right is only recorded, without a search; that is where the session saves time.
+    Before the next search, every recorded example is added to the bank with
+    `BottomUpSynthesizer.extend_bank`, which keeps the bank entries and extends their
+    signatures instead of recomputing them. Classes that the new examples split are
+    completed by growing their level again, which only adds the programs whose extended
+    signatures are new. Levels are grown again from the lowest one whose classes may have
+    split, and the terminals whenever a signature changed; the search then goes on from
+    the level the last one stopped in.
+    
+    Growing a level again enumerates all of its candidates, and once a level gains
+    programs every level above it is grown again. A new point usually splits some
+    terminal classes, so a search after an example that contradicts the program costs
+    about as much as a fresh search.
+    
+    The session owns its synthesizer: searching with it elsewhere in between replaces the
+    per-run state that the bank depends on.
+    """
+    
+    def __init__(self, synthesizer: BottomUpSynthesizer[T], examples: Optional[List[Any]] = None,
+                 max_iterations: int = 5, workers: int = 1):
+        self.synthesizer = synthesizer
+        self.examples: List[Any] = list(examples or [])
+        self.max_iterations = max_iterations
+        self.workers = workers
+        # Program satisfying all examples so far, None until the next search
+        self.program: Optional[T] = None
+        # Number of searches run and number of examples absorbed without one
+        self.searches = 0
+        self.reused = 0
+        # Search state for the first `indexed` examples: test inputs, signature cache and the
+        # bank entries found at each level; None before the first search
+        self.indexed = 0
+        self.test_inputs: Optional[List[Any]] = None
+        self.cache: Any = None
+        self.levels: List[List[Any]] = []
+        # Levels below this one hold every class of the current signatures
+        self.complete = 0
+        # Whether the terminals have to be enumerated again to find their split classes
+        self.stale_terminals = False
+    
+    def add_example(self, example: Any) -> T:
+        """
+        Add one example and return a program satisfying all examples so far
+        
+        The example is kept even if no program is found, in which case ValueError is raised
+        as by `BottomUpSynthesizer.synthesize`.
+        """
+        self.examples.append(example)
+        if self.program is not None and not self.synthesizer.failing_examples(self.program, [example]):
+            self.reused += 1
+            return self.program
+        self.program = None
+        return self.solve()
+    
+    def solve(self) -> T:
+        """The current program, searching for one if the examples have changed since the last search"""
+        if self.program is None:
+            self.searches += 1
+            with self.synthesizer.synthesis_run():
+                self.index_examples()
+                self.program = self.search()
+        return self.program
+    
+    def index_examples(self) -> None:
+        """Bring the bank up to date with the examples added since the last search"""
+        if not self.examples:
+            raise ValueError("No examples provided")
+        while self.test_inputs is not None and self.indexed < len(self.examples):
+            extended = self.synthesizer.extend_bank(self.examples[:self.indexed + 1], self.test_inputs,
+                                                    self.levels, self.cache)
+            if extended is None:
+                self.test_inputs = None
+                break
+            self.test_inputs, self.cache, lowest = extended
+            self.indexed += 1
+            if lowest is not None:
+                self.complete = min(self.complete, lowest)
+                self.stale_terminals = True
+        if self.test_inputs is None:
+            self.test_inputs = self.synthesizer.extract_test_inputs(self.examples)
+            self.cache = self.synthesizer.create_cache(self.test_inputs)
+            self.indexed = len(self.examples)
+            self.levels, self.complete, self.stale_terminals = [], 0, False
+    
+    def search(self) -> T:
+        """
+        Search the bank level by level for a program satisfying every example
+        
+        The cache is rebuilt level by level: kept entries of a level are carried over just
+        before it is checked and grown, so growing a level only deduplicates against the
+        levels up to it. A program that a split made equivalent to an entry of a deeper
+        level is then still found at its own level, which keeps results as small as those
+        of a fresh search. Such deeper entries stay in the bank.
+        """
+        synthesizer = self.synthesizer
+        target = synthesizer.target_signature(self.examples, self.test_inputs)
+        synthesizer.counterexamples = []
+        synthesizer.workers = self.workers
+        synthesizer.pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        source, self.cache = self.cache, synthesizer.create_cache(self.test_inputs)
+        carried = 0
+        try:
+            for iteration in range(self.max_iterations + 1):
+                if iteration == len(self.levels):
+                    self.levels.append([])
+                kept = self.levels[iteration]
+                correct = [program for program in kept if self.is_correct(program, target, source)]
+                regrow = iteration >= self.complete or iteration == 0 and self.stale_terminals
+                if correct and not regrow:
+                    return synthesizer.solution(synthesizer.remember(synthesizer.materialize(correct[0], source)))
+                if correct:
+                    # Growing the level again may find a smaller program of the same class first
+                    kept = [program for program in kept if program not in correct]
+                self.levels[iteration] = level = synthesizer.carry_over(kept, source, self.cache)
+                carried += 1
+                if not regrow:
+                    continue
+                
+                bank = [program for earlier in self.levels[:iteration] for program in earlier]
+                if iteration == 0:
+                    unique_programs = synthesizer.unique_terminals(self.examples, self.test_inputs, self.cache)
+                    self.stale_terminals = False
+                elif iteration == self.max_iterations:
+                    unique_programs = synthesizer.grow_final(bank, self.examples, self.test_inputs, self.cache, iteration)
+                else:
+                    unique_programs = synthesizer.grow_unique(bank, self.examples, self.test_inputs, self.cache, iteration)
+                found = len(level)
+                for program in unique_programs:
+                    if self.is_correct(program, target, self.cache):
+                        # The level is only partly grown, so the next search grows it again
+                        self.complete = min(self.complete, iteration)
+                        return synthesizer.solution(synthesizer.remember(synthesizer.materialize(program, self.cache)))
+                    level.append(program)
+                # The last level is searched for the target, so it is never complete; a level that
+                # gained programs leaves every level above it to be grown again
+                if iteration < self.max_iterations:
+                    self.complete = iteration + 1 if len(level) > found else max(self.complete, iteration + 1)
+        finally:
+            for depth in range(carried, len(self.levels)):
+                self.levels[depth] = synthesizer.carry_over(self.levels[depth], source, self.cache)
+            if synthesizer.pool is not None:
+                synthesizer.pool.shutdown(cancel_futures=True)
+                synthesizer.pool = None
+        raise ValueError(f"No program found within {self.max_iterations} iterations")
+    
+    def is_correct(self, program: Any, target: Any, cache: Any) -> bool:
+        """Whether an entry of cache satisfies every example, by its signature where there is a target"""
+        if target is not None:
+            return self.synthesizer.equivalence_key(cache[program]) == target
+        return self.synthesizer.is_correct(self.synthesizer.materialize(program, cache), self.examples)
@@ -0,0 +1,75 @@
+"""
+Hash-Consing for DSL Expressions
+This module lets DSL node classes intern their instances, so that every
+structurally unique expression exists exactly once.
+"""
+
+import inspect
+import weakref
+from abc import ABCMeta
+from typing import Any, Dict, Tuple
+
+class HashConsed(ABCMeta):
+    """
+    Metaclass that interns instances by their constructor arguments
+
+    Calling a class with arguments it has already seen returns the existing instance
+    instead of building a new one. Arguments are first normalized against the signature of
+    `__init__`, so positional, keyword (in any order) and defaulted spellings of the same node
+    share one instance, and they are keyed together with their types, so that e.g. a radius
+    of 3 and of 3.0 stay different nodes. Children of composite nodes are themselves
+    interned, so looking them up is O(1) and the whole table lookup does not depend on the
+    size of the expression. Each class keeps a weak table, so unused nodes are still freed.
+    """
+
+    def __init__(cls, name: str, bases: Tuple[type, ...], namespace: Dict[str, Any]):
+        super().__init__(name, bases, namespace)
+        cls._instances = weakref.WeakValueDictionary()
+        # Signature of __init__ without self, built on the first call
+        cls._init_signature = None
+
+    def __call__(cls, *args, **kwargs):
+        signature = cls._init_signature or cls._bind_signature()
+        if kwargs or len(args) != len(signature.parameters):
+            # Keyword, reordered and defaulted spellings of the same node must share one instance
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            args = bound.args
+        key = args + tuple(type(arg) for arg in args)
+        try:
+            instance = cls._instances.get(key)
+        except TypeError:
+            # Unhashable arguments cannot be interned; fall back to a plain instance
+            instance = super().__call__(*args)
+            instance._args, instance._hash = args, id(instance)
+            return instance
+        if instance is None:
+            instance = super().__call__(*args)
+            instance._args = args
+            instance._hash = hash((cls.__qualname__, key))
+            cls._instances[key] = instance
+        return instance
+
+    def _bind_signature(cls) -> inspect.Signature:
+        """The signature calls are normalized against: that of __init__, without self"""
+        if cls.__init__ is object.__init__:
+            parameters = []
+        else:
+            parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+        cls._init_signature = inspect.Signature(parameters)
+        return cls._init_signature
+
+class HashConsedNode(metaclass=HashConsed):
+    """Base for interned expression nodes: precomputed hash and identity-based equality"""
+
+    __slots__ = ('_args', '_hash', '__weakref__')
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __reduce__(self):
+        # Unpickling goes through the constructor again, so nodes are interned in the receiving process too
+        return (type(self), self._args)
@@ -0,0 +1,58 @@
+"""
+Synthesis Instrumentation
+This module defines the observers that `BottomUpSynthesizer.synthesize` reports
+per-iteration metrics to, and an exporter that writes them as JSON lines.
+"""
+
+import json
+from typing import Any, Dict, IO, Optional, Union
+
+class SynthesisObserver:
+    """
+    Receives one metrics record per synthesis iteration
+
+    Attach an observer by setting `synthesizer.observer`. Without one, `synthesize` takes no
+    timings and builds no records. Each record is a flat dict with these keys:
+
+        iteration          growth iteration (0 for terminals)
+        candidates         new candidates whose signature was computed or derived
+        unique             candidates that survived equivalence elimination
+        duplicates         candidates dropped as equivalent to an earlier one or uninterpretable
+        grow_seconds       time spent enumerating candidates and bookkeeping
+        signature_seconds  time spent computing or deriving signatures
+        check_seconds      time spent checking survivors for correctness
+        bank_programs      programs in the bank after the iteration
+        bank_bytes         bytes held by the bank's signatures
+        peak_rss_mb        peak resident memory of the process so far
+        solved             whether the iteration found a correct program
+        stopped_by         the `synthesize` limit reached during the iteration, or None
+    """
+
+    def on_iteration(self, metrics: Dict[str, Any]) -> None:
+        """Called after every iteration, including one cut short by a solution or a limit"""
+        pass
+
+class JsonLinesObserver(SynthesisObserver):
+    """Writes each metrics record as one JSON object per line, for log aggregation"""
+
+    def __init__(self, file: Union[str, IO[str]], **fields: Any):
+        # Either a path, opened for appending, or an open text file that stays owned by the caller
+        self._owned = isinstance(file, str)
+        self.file = open(file, "a") if self._owned else file
+        # Constant fields added to every record, e.g. a run name
+        self.fields = fields
+
+    def on_iteration(self, metrics: Dict[str, Any]) -> None:
+        self.file.write(json.dumps({**self.fields, **metrics}) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        """Close the file if this observer opened it"""
+        if self._owned and not self.file.closed:
+            self.file.close()
+
+    def __enter__(self) -> 'JsonLinesObserver':
+        return self
+
+    def __exit__(self, *exc_info: Optional[Any]) -> None:
+        self.close()
@@ -0,0 +1,129 @@
+"""
+Cross-Task Program Library
+This module keeps the programs that earlier synthesis tasks produced, so that a new task
+with the same intent is answered by checking stored programs instead of enumerating.
+"""
+
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+@dataclass
+class LibraryEntry:
+    """A stored program and its use statistics"""
+    program: Any
+    # Number of tasks the program was returned for, including the one that produced it
+    hits: int
+    # Library clock at the last use, for recency
+    last_used: int
+
+class ProgramLibrary:
+    """
+    Bounded store of synthesized programs, consulted by `BottomUpSynthesizer.synthesize`
+
+    Attach a library by setting `synthesizer.library`. Programs are grouped by the
+    synthesizer's `library_domain` and identified by their `fingerprint`, their outputs on a
+    fixed probe set: two programs that agree on every probe are kept once, as the smaller
+    one. Before enumerating, `synthesize` checks all programs of its domain against the new
+    examples in one batch (`library_matches`) and returns the smallest match. Only programs
+    that satisfy every example are added, after an enumeration finds them.
+
+    Beyond `max_entries` programs, the least frequently used one is evicted, the least
+    recently used among equally frequent ones ('lfu'), or just the least recently used
+    ('lru'). With a path, the library is loaded from it and written back after every change.
+    """
+
+    EVICTION_POLICIES = ('lfu', 'lru')
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1024, eviction: str = 'lfu'):
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction!r}, expected one of {self.EVICTION_POLICIES}")
+        self.path = path
+        self.max_entries = max_entries
+        self.eviction = eviction
+        # Domain -> fingerprint -> entry
+        self.sections: Dict[str, Dict[bytes, LibraryEntry]] = {}
+        # Advances on every lookup hit and every addition
+        self.clock = 0
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return sum(len(section) for section in self.sections.values())
+
+    def lookup(self, synthesizer: Any, examples: List[Any]) -> Optional[Any]:
+        """The smallest stored program of the synthesizer's domain that satisfies every example, or None"""
+        section = self.sections.get(synthesizer.library_domain())
+        if not section:
+            return None
+        entries = list(section.values())
+        matches = np.flatnonzero(synthesizer.library_matches([entry.program for entry in entries], examples))
+        if len(matches) == 0:
+            return None
+        # Frequent programs win among matches of the same size
+        entry = min((entries[index] for index in matches), key=lambda entry: (entry.program.size(), -entry.hits))
+        self.clock += 1
+        entry.hits += 1
+        entry.last_used = self.clock
+        self._changed()
+        return entry.program
+
+    def add(self, synthesizer: Any, program: Any) -> None:
+        """Store a program that satisfies a task, keeping the smaller of two with the same fingerprint"""
+        section = self.sections.setdefault(synthesizer.library_domain(), {})
+        fingerprint = synthesizer.fingerprint(program)
+        self.clock += 1
+        entry = section.get(fingerprint)
+        if entry is None:
+            section[fingerprint] = LibraryEntry(program, 1, self.clock)
+            self._evict(section[fingerprint])
+        else:
+            if program.size() < entry.program.size():
+                entry.program = program
+            entry.hits += 1
+            entry.last_used = self.clock
+        self._changed()
+
+    def _evict(self, keep: Optional[LibraryEntry]) -> None:
+        """Drop entries until the library fits max_entries; the entry just added stays"""
+        if self.eviction == 'lfu':
+            rank = lambda entry: (entry.hits, entry.last_used)
+        else:
+            rank = lambda entry: entry.last_used
+        while len(self) > self.max_entries:
+            _, section, fingerprint = min(((rank(entry), section, fingerprint)
+                                           for section in self.sections.values()
+                                           for fingerprint, entry in section.items() if entry is not keep),
+                                          key=lambda item: item[0])
+            del section[fingerprint]
+
+    def _changed(self) -> None:
+        if self.path is not None:
+            self.save()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the library; the file is replaced atomically, so a crash never leaves it half written"""
+        path = path or self.path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        state = {'clock': self.clock,
+                 'sections': {domain: [(fingerprint, entry.program, entry.hits, entry.last_used)
+                                       for fingerprint, entry in section.items()]
+                              for domain, section in self.sections.items()}}
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(state, f, protocol=4)
+        os.replace(temporary, path)
+
+    def load(self, path: Optional[str] = None) -> None:
+        """Replace the contents with a library written by `save`, evicting down to max_entries"""
+        with open(path or self.path, "rb") as f:
+            state = pickle.load(f)
+        self.clock = state['clock']
+        self.sections = {domain: {fingerprint: LibraryEntry(program, hits, last_used)
+                                  for fingerprint, program, hits, last_used in entries}
+                         for domain, entries in state['sections'].items()}
+        self._evict(None)
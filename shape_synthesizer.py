@@ -1,82 +1,1143 @@
 
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Any, TypeVar, Generic, Generator
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+from multiprocessing import shared_memory
+from typing import List, Tuple, Dict, Any, TypeVar, Generic, Generator, Optional, Callable, Iterable
+import time
 import numpy as np
-from tqdm import tqdm
 
-from enumerative_synthesis import BottomUpSynthesizer
-from shapes import Shape, Rectangle, Triangle, Circle, Union, Intersection, Mirror, Subtraction, Coordinate, MAX_COORD
+from enumerative_synthesis import BottomUpSynthesizer, ProgramStore, timed
+from shapes import (Shape, Rectangle, Triangle, Circle, Union, Intersection, Mirror, Subtraction, Coordinate,
+                    MAX_COORD, bounds_disjoint, canonical, commutative_operands, is_redundant)
+
+def pack_rows(masks: np.ndarray) -> np.ndarray:
+    """
+    Pack boolean membership rows into 64-bit words
+    
+    Args:
+        masks: Boolean array of shape (n_points,) or (n_rows, n_points)
+        
+    Returns:
+        uint64 array of shape (n_words,) or (n_rows, n_words), zero-padded
+    """
+    masks = np.asarray(masks, dtype=bool)
+    n_points = masks.shape[-1]
+    n_bytes = ((n_points + 63) // 64) * 8
+    packed = np.packbits(masks, axis=-1, bitorder='little')
+    padded = np.zeros(masks.shape[:-1] + (n_bytes,), dtype=np.uint8)
+    padded[..., :packed.shape[-1]] = packed
+    return padded.view(np.uint64)
+
+def pack_signature(mask: np.ndarray) -> bytes:
+    """Pack a boolean membership vector into a hashable bitset signature"""
+    return pack_rows(mask).tobytes()
+
+def row_keys(packed: np.ndarray) -> np.ndarray:
+    """View each row of a packed uint64 matrix as a single opaque value, for bulk hashing and sorting"""
+    packed = np.ascontiguousarray(packed)
+    return packed.view(np.dtype((np.void, packed.shape[-1] * 8))).reshape(packed.shape[:-1])
+
+def unpack_signature(signature: bytes, n_points: int) -> np.ndarray:
+    """Recover the boolean membership vector from a packed signature"""
+    bits = np.unpackbits(np.frombuffer(signature, dtype=np.uint8), bitorder='little')
+    return bits[:n_points].astype(bool)
+
+def grow_schedule(sizes: List[int]) -> Generator[Tuple[np.ndarray, Optional[np.ndarray]], None, None]:
+    """
+    Order in which a level is grown: by size of the new program, smallest first
+    
+    Yields (rows, None) for the mirrors of all programs of one size, and (rows, columns)
+    for binary compositions of every row with every column whose sizes add up to the
+    same result size. Indices within each group keep their program list order.
+    """
+    if len(sizes) == 0:
+        return
+    sizes = np.asarray(sizes)
+    buckets = {int(size): np.flatnonzero(sizes == size) for size in np.unique(sizes)}
+    for total in range(min(buckets) + 1, 2 * max(buckets) + 2):
+        if total - 1 in buckets:
+            yield buckets[total - 1], None
+        for first_size, rows in buckets.items():
+            if total - 1 - first_size in buckets:
+                yield rows, buckets[total - 1 - first_size]
+
+def redundant_pairs(structure: np.ndarray, first_ids: np.ndarray, second_ids: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `shapes.is_redundant` for Union, Intersection and Subtraction of row pairs
+    
+    structure holds (opcode, first child row, second child row) for every row of the bank,
+    with -1 for missing children. Returns a (len(first_ids), len(second_ids), 3) mask in
+    `ShapeSynthesizer.BINARY_OPERATORS` order.
+    """
+    mirror, union, intersection, subtraction = (ShapeSynthesizer.MIRROR, ShapeSynthesizer.UNION,
+                                                ShapeSynthesizer.INTERSECTION, ShapeSynthesizer.SUBTRACTION)
+    a, b = first_ids[:, np.newaxis], second_ids[np.newaxis, :]
+    op_a, left_a, right_a = (structure[first_ids, k][:, np.newaxis] for k in range(3))
+    op_b, left_b, right_b = (structure[second_ids, k][np.newaxis, :] for k in range(3))
+    
+    def absorbs(operand, op, left, right):
+        # operand is an operand of op(left, right), in the positions `_absorbs` checks
+        return (((op == mirror) | (op == subtraction)) & (left == operand) |
+                ((op == union) | (op == intersection)) & ((left == operand) | (right == operand)))
+    
+    lattice = (a == b) | absorbs(a, op_b, left_b, right_b) | absorbs(b, op_a, left_a, right_a)
+    empty = ((a == b) | (op_a == subtraction) & ((right_a == b) | (left_a == b)) |
+             (op_a == intersection) & ((left_a == b) | (right_a == b)) |
+             (op_b == union) & ((left_b == a) | (right_b == a)) | (op_b == mirror) & (left_b == a))
+    return np.stack([lattice, lattice, empty], axis=2)
+
+def combine_block(signatures: np.ndarray, first_ids: np.ndarray, second_ids: np.ndarray,
+                  structure: Optional[np.ndarray] = None) -> Tuple[np.ndarray, ...]:
+    """
+    Combine every first row with every second row using Union, Intersection and Subtraction
+    
+    Returns:
+        Flattened (first_ids, second_ids, op_ids, combined signatures) in (first, second, operator) order,
+        restricted to the pairs that `ShapeSynthesizer.grow` generates (see `redundant_pairs`)
+    """
+    left = signatures[first_ids][:, np.newaxis, :]
+    right = signatures[second_ids][np.newaxis, :, :]
+    combined = np.stack([left | right, left & right, left & ~right], axis=2)
+    
+    redundant = None if structure is None else redundant_pairs(structure, first_ids, second_ids)
+    first_ids, second_ids = np.meshgrid(first_ids, second_ids, indexing='ij')
+    valid = np.stack([first_ids < second_ids, first_ids < second_ids, first_ids != second_ids], axis=2)
+    if redundant is not None:
+        valid &= ~redundant
+    op_ids = np.broadcast_to(np.arange(3), valid.shape)
+    return (np.broadcast_to(first_ids[..., np.newaxis], valid.shape)[valid],
+            np.broadcast_to(second_ids[..., np.newaxis], valid.shape)[valid],
+            op_ids[valid], combined[valid])
+
+def first_occurrences(signatures: np.ndarray, key_words: int) -> np.ndarray:
+    """Sorted indices of the rows whose leading key_words words appear for the first time"""
+    _, first = np.unique(row_keys(signatures[:, :key_words]), return_index=True)
+    return np.sort(first)
+
+def combine_shared_rows(name: str, shape: Tuple[int, int], first_ids: np.ndarray, second_ids: np.ndarray,
+                        key_words: int, structure: Optional[np.ndarray] = None) -> Tuple[np.ndarray, ...]:
+    """
+    Pool worker: combine a block of a signature bank held in shared memory
+    
+    Returns the candidates of the block that are new within the block, in candidate order.
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        signatures = np.ndarray(shape, dtype=np.uint64, buffer=memory.buf)
+        block = combine_block(signatures, first_ids, second_ids, structure)
+        keep = first_occurrences(block[3], key_words)
+        return tuple(column[keep] for column in block)
+    finally:
+        memory.close()
+
+class ContainmentIndex:
+    """
+    Bank signatures indexed by how they relate to a target labelling T
+    
+    A correct Union(a, b) needs a, b ⊆ T; a correct Intersection(a, b) needs a, b ⊇ T;
+    a correct Subtraction(a, b) needs a ⊇ T and b disjoint from T. The find_* methods
+    only pair rows from the matching index and return the (first, second) row ids of the
+    pair with the smallest combined size, or None. `sizes` holds the size of every row and
+    must not decrease with the row, as in a bank grown level by level. Ties go to the pair
+    enumeration would reach first. `check` is called before every block of pairs, e.g. to
+    stop at a deadline.
+    """
+    
+    def __init__(self, signatures: np.ndarray, target: np.ndarray, sizes: np.ndarray,
+                 block_bytes: int = 64 * 2**20, check: Optional[Callable[[], None]] = None):
+        self.signatures = signatures
+        self.target = target
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self.block_bytes = block_bytes
+        self.check = check
+        self.subsets = np.flatnonzero(~np.any(signatures & ~target, axis=1))
+        self.supersets = np.flatnonzero(~np.any(target & ~signatures, axis=1))
+        self.disjoint = np.flatnonzero(~np.any(signatures & target, axis=1))
+    
+    def find_union(self) -> Optional[Tuple[int, int]]:
+        """Pair a ⊆ T with a later partner b ⊆ T covering T minus a"""
+        required = self.target & ~self.signatures[self.subsets]
+        return self._best_partner(self.subsets, required, self.subsets, cover=True, ordered=True)
+    
+    def find_intersection(self) -> Optional[Tuple[int, int]]:
+        """Pair a ⊇ T with a later partner b ⊇ T that misses everything a has outside T"""
+        excess = self.signatures[self.supersets] & ~self.target
+        return self._best_partner(self.supersets, excess, self.supersets, cover=False, ordered=True)
+    
+    def find_subtraction(self) -> Optional[Tuple[int, int]]:
+        """Pair a ⊇ T with a partner b disjoint from T covering everything a has outside T"""
+        excess = self.signatures[self.supersets] & ~self.target
+        return self._best_partner(self.supersets, excess, self.disjoint, cover=True, ordered=False)
+    
+    def _best_partner(self, firsts: np.ndarray, required: np.ndarray, partners: np.ndarray,
+                      cover: bool, ordered: bool) -> Optional[Tuple[int, int]]:
+        """
+        The smallest pair of a row in `firsts` and a partner that covers (or avoids) its required bits
+        
+        Partners must come after their row when `ordered` (the operator is commutative) and
+        differ from it otherwise. Rows are scanned in ascending order, so the scan stops once
+        no remaining row can beat the best pair found.
+        """
+        if len(firsts) == 0 or len(partners) == 0:
+            return None
+        candidates = self.signatures[partners][np.newaxis, :, :]
+        smallest_partner = self.sizes[partners].min()
+        block_rows = max(1, self.block_bytes // max(1, candidates.nbytes))
+        best = None
+        for start in range(0, len(firsts), block_rows):
+            if best is not None and best[0] <= self.sizes[firsts[start]] + smallest_partner:
+                break
+            if self.check is not None:
+                self.check()
+            first_ids = firsts[start:start + block_rows, np.newaxis]
+            block = required[start:start + block_rows, np.newaxis, :]
+            if cover:
+                matches = np.all((candidates & block) == block, axis=2)
+            else:
+                matches = ~np.any(candidates & block, axis=2)
+            matches &= first_ids < partners[np.newaxis, :] if ordered else first_ids != partners[np.newaxis, :]
+            rows, columns = np.nonzero(matches)
+            if len(rows) == 0:
+                continue
+            totals = self.sizes[firsts[start + rows]] + self.sizes[partners[columns]]
+            # nonzero lists pairs by row, then partner, so argmin keeps the first of equal sizes
+            position = int(np.argmin(totals))
+            if best is None or totals[position] < best[0]:
+                best = (int(totals[position]), int(firsts[start + rows[position]]), int(partners[columns[position]]))
+        return None if best is None else best[1:]
+
+class TerminalBank:
+    """
+    All terminal shapes over the integer grid [0, max_coord]^2, decoded from their index
+    
+    Rows follow the order of the terminal enumeration: a rectangle and a triangle for
+    every (bottom_left, top_right) corner pair, then a circle for every center and radius.
+    Rectangle and triangle rows hold (x0, y0, x1, y1), circle rows hold (cx, cy, r, 0).
+    Rows are computed from their index on demand, so the bank is evaluated a chunk of
+    rows at a time and never stored; there are O(max_coord^4) of them.
+    """
+    
+    RECTANGLE, TRIANGLE, CIRCLE = 0, 1, 2
+    
+    def __init__(self, max_coord: int = MAX_COORD):
+        self.max_coord = max_coord
+        side = max_coord + 1
+        # Corner pairs are ordered by bottom-left corner (x0 major), then top-right corner (x1 major);
+        # bottom-left (x0, y0) owns the pairs from pair_starts[x0 * side + y0] on
+        grid = np.arange(side)
+        owned = np.outer(max_coord - grid, max_coord - grid).ravel()
+        self.pair_starts = np.concatenate([[0], np.cumsum(owned)])
+        self.n_pairs = int(self.pair_starts[-1])
+        self.n_circles = side * side * max_coord
+    
+    def __len__(self) -> int:
+        return 2 * self.n_pairs + self.n_circles
+    
+    def rows(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """The kinds and (n, 4) parameter rows of the terminals at the given indices"""
+        indices = np.asarray(indices, dtype=np.int64)
+        side = self.max_coord + 1
+        kinds = np.full(len(indices), self.CIRCLE, dtype=np.int8)
+        params = np.zeros((len(indices), 4), dtype=np.int64)
+        
+        boxed = indices < 2 * self.n_pairs
+        pairs = indices[boxed] // 2
+        kinds[boxed] = indices[boxed] % 2
+        corner = np.searchsorted(self.pair_starts, pairs, side='right') - 1
+        x0, y0 = corner // side, corner % side
+        offset, heights = pairs - self.pair_starts[corner], self.max_coord - y0
+        params[boxed] = np.stack([x0, y0, x0 + 1 + offset // heights, y0 + 1 + offset % heights], axis=1)
+        
+        circles = indices[~boxed] - 2 * self.n_pairs
+        center = circles // self.max_coord
+        params[~boxed, :3] = np.stack([center // side, center % side, circles % self.max_coord + 1], axis=1)
+        return kinds, params
+    
+    def chunks(self, n_points: int, block_bytes: int = 16 * 2**20) -> Generator[Tuple[int, int], None, None]:
+        """(start, stop) index ranges whose membership matrices on n_points points fit in block_bytes"""
+        step = max(1024, block_bytes // max(1, 8 * n_points))
+        for start in range(0, len(self), step):
+            yield start, min(start + step, len(self))
+    
+    def membership(self, xs: np.ndarray, ys: np.ndarray, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Evaluate the terminals start..stop on the points, returning a (stop - start, n_points) boolean matrix"""
+        kinds, params = self.rows(np.arange(start, len(self) if stop is None else stop))
+        xs = np.asarray(xs)[np.newaxis, :]
+        ys = np.asarray(ys)[np.newaxis, :]
+        result = np.empty((len(kinds), xs.shape[1]), dtype=bool)
+        
+        boxed = kinds != self.CIRCLE
+        # Each bound is tested once per grid line and gathered per row, which beats broadcasting
+        # four comparisons over every (row, point) pair
+        grid = np.arange(self.max_coord + 1)[:, np.newaxis]
+        x_from, x_to, y_from, y_to = grid <= xs, xs <= grid, grid <= ys, ys <= grid
+        result[boxed] = (x_from[params[boxed, 0]] & y_from[params[boxed, 1]] &
+                         x_to[params[boxed, 2]] & y_to[params[boxed, 3]])
+        # Below the diagonal from (x0, y0) to (x1, y1), cross-multiplied to avoid the slope division
+        # and in the same form as Triangle.interpret, so points on the diagonal round the same way
+        triangles = np.flatnonzero(kinds == self.TRIANGLE)
+        x0, y0, x1, y1 = (column[:, np.newaxis] for column in params[triangles].T)
+        result[triangles] &= (ys - y0) * (x1 - x0) <= (y1 - y0) * (xs - x0)
+        
+        cx, cy, r, _ = (column[:, np.newaxis] for column in params[~boxed].T)
+        result[~boxed] = (xs - cx)**2 + (ys - cy)**2 <= r**2
+        return result
+    
+    def point_classes(self, xs: np.ndarray, ys: np.ndarray,
+                      block_bytes: int = 16 * 2**20) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Group points that no program can tell apart
+        
+        A program's value at a point depends only on which terminals contain the point and
+        its mirror image, so points whose membership columns agree on both the original and
+        the swapped coordinates are indistinguishable. Terminals are evaluated a chunk at a time
+        to bound memory.
+        
+        Returns:
+            (representatives, classes): the index of the first point of every class in point
+            order, and the class of every point
+        """
+        # Coincident points trivially share a class, so only distinct coordinates are evaluated
+        _, distinct, coincident = np.unique(np.stack([xs, ys], axis=1), axis=0, return_index=True, return_inverse=True)
+        if len(distinct) < len(xs):
+            order = np.argsort(distinct)
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+            distinct = distinct[order]
+            firsts, classes = self.point_classes(xs[distinct], ys[distinct], block_bytes)
+            return distinct[firsts], classes[position[coincident.ravel()]]
+
+        # Refine one partition terminal chunk by terminal chunk: points stay together only while
+        # every terminal so far contains both or neither, at the points and at their mirror images
+        classes = np.zeros(len(xs), dtype=np.uint64)
+        for start, stop in self.chunks(2 * len(xs), block_bytes):
+            columns = np.concatenate([pack_rows(self.membership(xs, ys, start, stop).T),
+                                      pack_rows(self.membership(ys, xs, start, stop).T)], axis=1)
+            _, classes = np.unique(row_keys(np.concatenate([classes[:, np.newaxis], columns], axis=1)),
+                                   return_inverse=True)
+            classes = classes.ravel().astype(np.uint64)
+            if classes.max() == len(xs) - 1:
+                # Every point is alone in its class, so no later terminal can split anything
+                break
+        _, firsts, inverse = np.unique(classes, return_index=True, return_inverse=True)
+        # Number classes in order of first appearance
+        order = np.argsort(firsts)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return firsts[order], rank[inverse.ravel()]
+    
+    def shape(self, index: int) -> Shape:
+        """Build the Shape object for a single terminal row"""
+        kinds, params = self.rows([index])
+        a, b, c, d = (int(value) for value in params[0])
+        kind = kinds[0]
+        if kind == self.RECTANGLE:
+            return Rectangle(Coordinate(a, b), Coordinate(c, d))
+        if kind == self.TRIANGLE:
+            return Triangle(Coordinate(a, b), Coordinate(c, d))
+        return Circle(Coordinate(a, b), c)
+    
+    def index(self, shape: Shape) -> int:
+        """Row of a terminal shape in the bank, the inverse of `shape`"""
+        side = self.max_coord + 1
+        if isinstance(shape, Circle):
+            center = shape.center.x * side + shape.center.y
+            return 2 * self.n_pairs + center * self.max_coord + shape.radius - 1
+        (x0, y0), (x1, y1) = (shape.bottom_left.x, shape.bottom_left.y), (shape.top_right.x, shape.top_right.y)
+        pair = int(self.pair_starts[x0 * side + y0]) + (x1 - x0 - 1) * (self.max_coord - y0) + y1 - y0 - 1
+        return 2 * pair + (self.TRIANGLE if isinstance(shape, Triangle) else self.RECTANGLE)
 
 class ShapeSynthesizer(BottomUpSynthesizer[Shape]):
     """Bottom-up enumerative synthesizer for geometric shapes"""
     
-    def generate_terminals(self, examples: List[Tuple[float, float, bool]]) -> List[Shape]:
-        """Generate all terminal shapes (rectangles, triangles, circles)"""
-        shapes = []
-        
-        # Generate all coordinates
-        coords = [Coordinate(x, y) for x in range(MAX_COORD + 1) for y in range(MAX_COORD + 1)]
-        
-        # Generate rectangles and triangles
-        total_rect_tri = len(coords) * len(coords)
-        with tqdm(total=total_rect_tri, desc="[Generating Teminals] Rectangles & Triangles", unit="shape") as pbar:
-            for bottom_left in coords:
-                for top_right in coords:
-                    if bottom_left.x < top_right.x and bottom_left.y < top_right.y:
-                        shapes.append(Rectangle(bottom_left, top_right))
-                        shapes.append(Triangle(bottom_left, top_right))
-                    pbar.update(1)
-        
-        # Generate circles
-        total_circles = len(coords) * MAX_COORD
-        with tqdm(total=total_circles, desc="[Generating Teminals] Circles", unit="circle") as pbar:
-            for center in coords:
-                for radius in range(1, MAX_COORD + 1):
-                    shapes.append(Circle(center, radius))
-                    pbar.update(1)
-        
-        return shapes
-    
-    def grow(self, program_list: List[Shape], examples: List[Any]) -> List[Shape]:
-        """Grow the program list by one level using all possible operations"""
-        
-        ###################################################################################################
-        #                                                                                                 #
-        # Part 1 (a): Synthesizing Geometric Shapes (`grow`)                                              #
-        #                                                                                                 #
-        # TODO: Add your implementation here.                                                             #
-        #                                                                                                 #
-        # NOTE: Below is a placeholder implementation that does not grow the program list. You need to    #
-        #       implement the actual growth logic here.                                                   #
-        #                                                                                                 #
-        ###################################################################################################             
-
-        new_programs = []
-        
-        return new_programs
+    # Binary operators in the order `grow` emits them for each (first, second) pair
+    BINARY_OPERATORS = (Union, Intersection, Subtraction)
+    # Opcodes of the columnar program store; binary opcodes follow BINARY_OPERATORS order
+    TERMINAL, MIRROR, UNION, INTERSECTION, SUBTRACTION = range(5)
+    # Cap on block_bytes while a deadline is set: the deadline is checked between blocks, and a
+    # block this size takes tens of milliseconds where a 64 MB one can take seconds
+    deadline_block_bytes: int = 4 * 2**20
+    
+    def __init__(self, packed_signatures: bool = True, semantic_grow: bool = True,
+                 batched_grow: bool = True, goal_directed: bool = True, columnar: bool = True,
+                 compress_examples: bool = True, block_bytes: int = 64 * 2**20, max_coord: int = MAX_COORD):
+        # Represent signatures as packed bitsets (raw bytes of uint64 words) instead of bool tuples
+        self.packed_signatures = packed_signatures
+        # Derive Union/Intersection/Subtraction signatures from cached child signatures (packed only)
+        self.semantic_grow = semantic_grow
+        # Combine whole blocks of packed signatures at once and only build ASTs for unseen ones (packed only)
+        self.batched_grow = batched_grow
+        # Search the last level through a containment index on the target instead of all pairs (packed only)
+        self.goal_directed = goal_directed
+        # Keep the bank in a columnar ProgramStore and run synthesis on ids (packed and batched only)
+        self.columnar = columnar and packed_signatures and batched_grow
+        # Fingerprint one representative per class of points that no terminal tells apart
+        self.compress_examples = compress_examples
+        # Upper bound on the size of one block of combined signatures
+        self.block_bytes = block_bytes
+        # Terminal corners, centers and radii range over the integers in [0, max_coord]
+        self.max_coord = max_coord
+        self.terminal_bank = TerminalBank(max_coord)
+    
+    def generate_terminals(self, examples: List[Tuple[float, float, bool]]) -> Iterable[Shape]:
+        """Generate all terminal shapes (rectangles, triangles, circles), one at a time"""
+        return (self.terminal_bank.shape(i) for i in range(len(self.terminal_bank)))
+    
+    def unique_terminals(self, examples: List[Tuple[float, float, bool]],
+                         test_inputs: List[Tuple[np.ndarray, np.ndarray]],
+                         cache: Dict[Shape, Any]) -> Generator[Shape, None, Dict[Shape, Any]]:
+        """
+        Evaluate the terminal bank a chunk at a time and only build shapes for unique signatures
+        
+        Each chunk is deduplicated in bulk, so empty terminals and terminals equivalent to an
+        earlier one are dropped without leaving numpy.
+        """
+        if not self.packed_signatures:
+            return (yield from super().unique_terminals(examples, test_inputs, cache))
+        
+        xs, ys = test_inputs[0]
+        seen = {self.equivalence_key(signature) for signature in cache.values()}
+        for start, stop in self.terminal_bank.chunks(2 * len(xs), self.working_block_bytes()):
+            self.check_deadline()
+            computing = time.perf_counter()
+            packed = np.concatenate([pack_rows(self.terminal_bank.membership(xs, ys, start, stop)),
+                                     pack_rows(self.terminal_bank.membership(ys, xs, start, stop))], axis=1)
+            if self.metrics is not None:
+                self.metrics['signature_seconds'] += time.perf_counter() - computing
+                self.metrics['candidates'] += len(packed)
+            yield from self._unseen_rows(packed, seen, cache, lambda index, signature: self._record(
+                cache, self.TERMINAL, signature, param=start + index))
+        return cache
+    
+    def grow(self, program_list: List[Shape], examples: List[Any]) -> Iterable[Shape]:
+        """
+        Grow the program list by one level using all possible operations
+        
+        Yields the existing programs, then every new Mirror, Union, Intersection and
+        Subtraction in the order of `grow_schedule`, i.e. smallest programs first.
+        Each unordered pair is visited once, at its bank positions i < j, and its Union and
+        Intersection are built with `shapes.commutative_operands`; candidates that
+        `shapes.is_redundant` rules out, including those that bounding boxes show to be
+        empty or equal to an operand, are never built.
+        """
+        program_list = list(program_list)
+        yield from program_list
+        
+        for rows, columns in grow_schedule([shape.size() for shape in program_list]):
+            if columns is None:
+                for i in rows:
+                    if not is_redundant(Mirror, program_list[i]):
+                        yield Mirror(program_list[i])
+                continue
+            for i in rows:
+                first = program_list[i]
+                for j in columns:
+                    second = program_list[j]
+                    # Union and Intersection are ruled out by the same absorption rules; Intersection
+                    # is also empty when the bounding boxes are disjoint
+                    if i < j and not is_redundant(Union, first, second):
+                        operands = commutative_operands(first, second)
+                        yield Union(*operands)
+                        if not bounds_disjoint(first.bounds, second.bounds):
+                            yield Intersection(*operands)
+                    if i != j and not is_redundant(Subtraction, first, second):
+                        yield Subtraction(first, second)
+    
+    def expand(self, program: Shape, program_list: List[Shape], examples: List[Any]) -> Iterable[Shape]:
+        """
+        Mirror of program, and its Union, Intersection and Subtraction (either way round) with every bank entry
+        
+        Candidates that `shapes.canonical` rules out are skipped, as in `grow`.
+        """
+        if not is_redundant(Mirror, program):
+            yield Mirror(program)
+        for other in program_list:
+            for first, second, operator in ((program, other, Union), (program, other, Intersection),
+                                            (program, other, Subtraction), (other, program, Subtraction)):
+                candidate = canonical(operator, first, second)
+                if candidate is not None:
+                    yield candidate
+    
+    def distance(self, signature: Any, target: Any, examples: List[Tuple[float, float, bool]]) -> float:
+        """Examples the signature misclassifies: the Hamming distance to the target, weighted by class size"""
+        if target is None:
+            _, _, expected = self.example_arrays(examples)
+            mismatches = np.asarray(signature) != expected[self.representatives].astype(bool)
+            return float(mismatches @ self.class_weights)
+        key = np.frombuffer(self.equivalence_key(signature), dtype=np.uint8)
+        mismatches = np.unpackbits(key ^ np.frombuffer(target, dtype=np.uint8), bitorder='little')
+        return float(mismatches[:len(self.class_weights)] @ self.class_weights)
+    
+    def grow_unique(self, program_list: List[Shape], examples: List[Any],
+                    test_inputs: List[Tuple[np.ndarray, np.ndarray]], cache: Dict[Shape, Any],
+                    iteration: int) -> Generator[Shape, None, Dict[Shape, Any]]:
+        """
+        Batched version of `grow` followed by `eliminate_equivalents`
+        
+        Mirrors come from the two cached halves of each signature. Binary compositions are
+        evaluated as broadcast bitwise operations between a block of left signatures and
+        right signatures, deduplicated in bulk, and only the (operator, first, second)
+        triples with unseen signatures are turned into shapes.
+        Candidates are visited in the same order as `grow`, so the same programs survive.
+        Bounding boxes are not consulted here: a box test costs as much as the packed bitwise
+        operation it would save, and the candidates it rules out are duplicates or empty anyway.
+        """
+        if not (self.batched_grow and self.packed_signatures):
+            return (yield from super().grow_unique(program_list, examples, test_inputs, cache, iteration))
+        
+        # The caller appends survivors to program_list while this generator runs
+        program_list = list(program_list)
+        if not program_list:
+            return cache
+        signatures = self._signature_matrix(program_list, cache)
+        seen = {self.equivalence_key(signature) for signature in cache.values()}
+        
+        metrics = self.metrics
+        blocks = self._combined_blocks(signatures, grow_schedule(self._sizes(program_list, cache)),
+                                       self._structure(program_list, cache))
+        for kind, first_ids, second_ids, op_ids, combined in timed(blocks, metrics, 'signature_seconds'):
+            self.check_deadline()
+            if metrics is not None:
+                metrics['candidates'] += len(combined)
+            if kind == 'mirror':
+                yield from self._unseen_rows(combined, seen, cache, lambda index, signature: self._record(
+                    cache, self.MIRROR, signature, first=program_list[first_ids[index]]))
+            else:
+                yield from self._unseen_rows(combined, seen, cache, lambda index, signature: self._record(
+                    cache, self.UNION + op_ids[index], signature,
+                    first=program_list[first_ids[index]], second=program_list[second_ids[index]]))
+        return cache
+    
+    def _combined_blocks(self, signatures: np.ndarray, schedule: Iterable[Tuple[np.ndarray, Optional[np.ndarray]]],
+                         structure: np.ndarray) -> Generator[Tuple[Any, ...], None, None]:
+        """
+        Candidate signature blocks in candidate order, computed locally or by the process pool
+        
+        Yields ('mirror' | 'binary', first_ids, second_ids, op_ids, signatures). Pool workers
+        read the bank from shared memory; only a bounded number of blocks is in flight, and
+        blocks are consumed in submission order so the serial order is kept.
+        """
+        half = signatures.shape[1] // 2
+        n_ops = len(self.BINARY_OPERATORS)
+        block_bytes = self.working_block_bytes()
+        
+        def blocks() -> Generator[Tuple[np.ndarray, Optional[np.ndarray]], None, None]:
+            for rows, columns in schedule:
+                if columns is None:
+                    yield rows, None
+                    continue
+                block_rows = max(1, block_bytes // max(1, len(columns) * n_ops * signatures.shape[1] * 8))
+                for start in range(0, len(rows), block_rows):
+                    yield rows[start:start + block_rows], columns
+        
+        def mirror_block(rows: np.ndarray) -> Tuple[Any, ...]:
+            # Mirror(p) is sig(p) | sig_swapped(p) on both halves; Mirror(Mirror(p)) would be Mirror(p)
+            rows = rows[structure[rows, 0] != self.MIRROR]
+            mirrored = signatures[rows, :half] | signatures[rows, half:]
+            return 'mirror', rows, None, None, np.concatenate([mirrored, mirrored], axis=1)
+        
+        if self.pool is None:
+            for rows, columns in blocks():
+                if columns is None:
+                    yield mirror_block(rows)
+                else:
+                    yield ('binary',) + combine_block(signatures, rows, columns, structure)
+            return
+        
+        memory = shared_memory.SharedMemory(create=True, size=signatures.nbytes)
+        pending = deque()
+        try:
+            np.ndarray(signatures.shape, dtype=np.uint64, buffer=memory.buf)[:] = signatures
+            for rows, columns in blocks():
+                if columns is None:
+                    pending.append(mirror_block(rows))
+                else:
+                    pending.append(self.pool.submit(combine_shared_rows, memory.name, signatures.shape,
+                                                    rows, columns, self.key_bytes // 8, structure))
+                while len(pending) > 2 * self.workers or (pending and isinstance(pending[0], tuple)):
+                    head = pending.popleft()
+                    yield head if isinstance(head, tuple) else ('binary',) + head.result()
+            while pending:
+                head = pending.popleft()
+                yield head if isinstance(head, tuple) else ('binary',) + head.result()
+        finally:
+            for future in pending:
+                if not isinstance(future, tuple):
+                    future.cancel()
+            memory.close()
+            memory.unlink()
+    
+    def working_block_bytes(self) -> int:
+        """Size of the blocks enumeration works in: block_bytes, capped while a deadline is set"""
+        if self.deadline_at is None:
+            return self.block_bytes
+        return min(self.block_bytes, self.deadline_block_bytes)
+    
+    def grow_final(self, program_list: List[Shape], examples: List[Any],
+                   test_inputs: List[Tuple[np.ndarray, np.ndarray]], cache: Dict[Shape, Any],
+                   iteration: int) -> Generator[Shape, None, Dict[Shape, Any]]:
+        """
+        Search the last level for a correct program only
+        
+        Instead of enumerating all pairs, only bank entries compatible with the target
+        labelling are combined (see `ContainmentIndex`). Yields at most one program.
+        """
+        if not (self.goal_directed and self.packed_signatures):
+            return (yield from super().grow_final(program_list, examples, test_inputs, cache, iteration))
+        if not program_list:
+            return cache
+        
+        target = self.target_signature(examples, test_inputs)
+        found = self.find_final(self._signature_matrix(program_list, cache), np.frombuffer(target, dtype=np.uint64),
+                                np.asarray(self._sizes(program_list, cache)))
+        if found is not None:
+            opcode, first, second, signature = found
+            if self.metrics is not None:
+                self.metrics['candidates'] += 1
+            yield self._record(cache, opcode, signature, first=program_list[first],
+                               second=None if second is None else program_list[second])
+        return cache
+    
+    def find_final(self, signatures: np.ndarray, target: np.ndarray,
+                   sizes: np.ndarray) -> Optional[Tuple[int, int, Optional[int], np.ndarray]]:
+        """
+        The smallest correct program one level above a bank of packed signatures, without enumerating the level
+        
+        Mirror, Union, Intersection and Subtraction candidates come from a `ContainmentIndex`;
+        of those, the smallest program wins, with ties broken in the order `grow_schedule`
+        enumerates the level, so the answer is the one enumeration would find.
+        
+        Args:
+            signatures: Packed signatures of the bank
+            target: Packed target labelling of the original points
+            sizes: Program size of every bank row, non-decreasing with the row
+        
+        Returns:
+            (opcode, first row, second row or None, signature) of the program, or None
+        """
+        half = signatures.shape[1] // 2
+        index = ContainmentIndex(signatures[:, :half], target, sizes, self.working_block_bytes(),
+                                 self.check_deadline)
+        found = []
+        
+        # Mirror(a) can only be correct when a ⊆ T
+        mirrored = signatures[index.subsets, :half] | signatures[index.subsets, half:]
+        correct = np.flatnonzero(np.all(mirrored == target, axis=1))
+        if len(correct):
+            row = int(index.subsets[correct[0]])
+            found.append(((1 + int(index.sizes[row]), 0, row, 0, self.MIRROR), (self.MIRROR, row, None,
+                          np.concatenate([mirrored[correct[0]], mirrored[correct[0]]]))))
+        
+        for opcode, find in ((self.UNION, index.find_union), (self.INTERSECTION, index.find_intersection),
+                             (self.SUBTRACTION, index.find_subtraction)):
+            pair = find()
+            if pair is not None:
+                first, second = signatures[pair[0]], signatures[pair[1]]
+                combined = {self.UNION: first | second, self.INTERSECTION: first & second,
+                            self.SUBTRACTION: first & ~second}[opcode]
+                # At one size, enumeration grows mirrors first, then pairs by row, partner and operator
+                size = 1 + int(index.sizes[pair[0]] + index.sizes[pair[1]])
+                found.append(((size, 1, pair[0], pair[1], opcode), (opcode, pair[0], pair[1], combined)))
+        if not found:
+            return None
+        return min(found, key=lambda candidate: candidate[0])[1]
+    
+    def create_cache(self, test_inputs: List[Tuple[np.ndarray, np.ndarray]]) -> Any:
+        """A ProgramStore in columnar mode, so the bank holds ids instead of Shape objects"""
+        if not self.columnar:
+            return super().create_cache(test_inputs)
+        return ProgramStore(signature_words=2 * self.key_bytes // 8)
+    
+    def materialize(self, program: Any, cache: Any) -> Shape:
+        """Build the Shape for a program id of the columnar store"""
+        if not isinstance(cache, ProgramStore):
+            return program
+        return cache.program(program, self._build)
+    
+    def save_bank(self, path: str, program_list: List[Any], cache: Any) -> None:
+        """A columnar bank is saved column by column, with the bank entries as an id array"""
+        if not isinstance(cache, ProgramStore):
+            return super().save_bank(path, program_list, cache)
+        cache.save(path)
+        np.save(os.path.join(path, "programs.npy"), np.asarray(program_list, dtype=np.int64))
+    
+    def load_bank(self, path: str, test_inputs: List[Tuple[np.ndarray, np.ndarray]],
+                  count: int) -> Tuple[List[Any], Any]:
+        """Memory-map a columnar bank written by `save_bank`"""
+        if not self.columnar:
+            return super().load_bank(path, test_inputs, count)
+        program_list = np.load(os.path.join(path, "programs.npy"))[:count].tolist()
+        return program_list, ProgramStore.load(path, max(program_list, default=-1) + 1)
+    
+    def signature_rows(self, signatures: List[Any]) -> np.ndarray:
+        """Packed signatures are saved as a uint64 matrix"""
+        if not self.packed_signatures:
+            return super().signature_rows(signatures)
+        return np.frombuffer(b"".join(signatures), dtype=np.uint64).reshape(len(signatures), 2 * self.key_bytes // 8)
+    
+    def signature_from_row(self, row: np.ndarray) -> Any:
+        if not self.packed_signatures:
+            return super().signature_from_row(row)
+        return row.tobytes()
+    
+    def _build(self, opcode: int, param: int, first: Optional[Shape], second: Optional[Shape]) -> Shape:
+        """
+        Build one Shape node from its opcode, parameter and already built children
+        
+        Batched growth pairs rows by bank position; Union and Intersection operands are put in
+        `shapes.commutative_operands` order here, so every path builds the same node.
+        """
+        if opcode == self.TERMINAL:
+            return self.terminal_bank.shape(param)
+        if opcode == self.MIRROR:
+            return Mirror(first)
+        if opcode != self.SUBTRACTION:
+            first, second = commutative_operands(first, second)
+        return self.BINARY_OPERATORS[opcode - self.UNION](first, second)
+    
+    def _record(self, cache: Any, opcode: int, signature: np.ndarray, param: int = ProgramStore.NO_CHILD,
+                first: Any = None, second: Any = None) -> Any:
+        """
+        Add a unique program to the cache and return its bank entry
+        
+        `first` and `second` are bank entries: Shapes for a dict cache, ids for a ProgramStore.
+        """
+        if isinstance(cache, ProgramStore):
+            children = [child for child in (first, second) if child is not None]
+            return cache.append(opcode, 1 + sum(int(cache.sizes[child]) for child in children), signature,
+                                left=ProgramStore.NO_CHILD if first is None else first,
+                                right=ProgramStore.NO_CHILD if second is None else second, param=param)
+        shape = self._build(opcode, param, first, second)
+        cache[shape] = signature.tobytes()
+        return shape
+    
+    def _sizes(self, program_list: List[Any], cache: Any) -> List[int]:
+        """Sizes of the bank entries"""
+        if isinstance(cache, ProgramStore):
+            return cache.sizes[np.asarray(program_list, dtype=np.int64)]
+        return [shape.size() for shape in program_list]
+    
+    def _structure(self, program_list: List[Any], cache: Any) -> np.ndarray:
+        """(opcode, first child row, second child row) of every bank entry, -1 where there is no child"""
+        if isinstance(cache, ProgramStore):
+            ids = np.asarray(program_list, dtype=np.int64)
+            # Children are bank entries too; map their store ids to bank rows
+            rows = np.full(cache.count + 1, -1, dtype=np.int64)
+            rows[ids] = np.arange(len(ids))
+            # NO_CHILD (-1) lands on the extra last slot, which stays -1
+            return np.stack([cache.opcodes[ids], rows[cache.lefts[ids]], rows[cache.rights[ids]]], axis=1)
+        rows = {shape: row for row, shape in enumerate(program_list)}
+        structure = np.full((len(program_list), 3), -1, dtype=np.int64)
+        for row, shape in enumerate(program_list):
+            if isinstance(shape, Mirror):
+                structure[row] = (self.MIRROR, rows.get(shape.shape, -1), -1)
+            elif isinstance(shape, self.BINARY_OPERATORS):
+                structure[row] = (self.UNION + self.BINARY_OPERATORS.index(type(shape)),
+                                  rows.get(shape.first, -1), rows.get(shape.second, -1))
+            else:
+                structure[row, 0] = self.TERMINAL
+        return structure
+    
+    def _signature_matrix(self, program_list: List[Any], cache: Any) -> np.ndarray:
+        """Stack the cached packed signatures of the bank entries into an (n_programs, n_words) matrix"""
+        if isinstance(cache, ProgramStore):
+            return cache.signatures[np.asarray(program_list, dtype=np.int64)]
+        return np.frombuffer(b''.join(cache[shape] for shape in program_list),
+                             dtype=np.uint64).reshape(len(program_list), -1)
+    
+    def _unseen_rows(self, signatures: np.ndarray, seen: set, cache: Any,
+                     record: Callable[[int, np.ndarray], Any]) -> Generator[Any, None, Any]:
+        """
+        Record and yield every row whose equivalence key was not seen before, in row order
+        
+        Rows are deduplicated in bulk first, so `record` only runs for unseen signatures.
+        """
+        key_words = self.key_bytes // 8
+        for index in first_occurrences(signatures, key_words):
+            key = signatures[index, :key_words].tobytes()
+            if key in seen:
+                continue
+            seen.add(key)
+            yield record(index, signatures[index])
+        return cache
+    
+    def extend_bank(self, examples: List[Tuple[float, float, bool]], test_inputs: List[Tuple[np.ndarray, np.ndarray]],
+                    levels: List[List[Any]], cache: Any) -> Optional[Tuple[List[Tuple[np.ndarray, np.ndarray]], Any, Optional[int]]]:
+        """
+        Add the last example to a bank built for the examples before it
+        
+        A point that no terminal tells apart from a representative joins its class, and no
+        signature changes. Any other point becomes a new representative: every bank entry
+        gains one bit at the point and one at its mirror image (see `_point_bits`). The
+        extended signatures of entries outside the bank, such as the last solution, are left
+        unspecified.
+        
+        The candidates of a level are built from the entries of the levels below it, so if
+        some old representative agrees with the new point on all of those entries, at the
+        point and at its mirror image, every candidate of the level has the same value at
+        both points and no class of the level splits. The lowest level without such a
+        representative is returned.
+        """
+        program_list = [program for level in levels for program in level]
+        xs, ys = test_inputs[0]
+        x, y, label = examples[-1]
+        
+        if self.compress_examples:
+            _, classes = self.terminal_bank.point_classes(np.append(xs, x), np.append(ys, y))
+            if classes[-1] < len(xs):
+                first = self.representatives[classes[-1]]
+                if bool(examples[first][2]) != bool(label):
+                    raise ValueError(f"Examples {examples[first]} and {examples[-1]} are on the same side of "
+                                     f"every terminal but have different labels, so no program separates them")
+                self.class_weights[classes[-1]] += 1
+                self.example_classes = np.append(self.example_classes, classes[-1])
+                return test_inputs, cache, None
+        
+        point = len(xs)
+        bits = self._point_bits(program_list, cache, x, y)
+        self.representatives = np.append(self.representatives, len(examples) - 1)
+        self.class_weights = np.append(self.class_weights, 1)
+        self.example_classes = np.append(self.example_classes, point)
+        xs, ys = np.append(xs, x), np.append(ys, y)
+        words = self.key_bytes // 8
+        self.key_bytes = ((len(xs) + 63) // 64) * 8
+        if not program_list:
+            return [(xs, ys), (ys, xs)], cache, 0
+        if not self.packed_signatures:
+            # Without the mirror half there is nothing to compare representatives on
+            return [(xs, ys), (ys, xs)], {program: cache[program] + (bit,)
+                                          for program, bit in zip(program_list, bits[:, 0])}, 1
+        
+        signatures = self._signature_matrix(program_list, cache)
+        half = self.key_bytes // 8
+        extended = np.zeros((len(program_list), 2 * half), dtype=np.uint64)
+        extended[:, :words] = signatures[:, :words]
+        extended[:, half:half + words] = signatures[:, words:]
+        shift = np.uint64(point % 64)
+        extended[:, point // 64] |= bits[:, 0].astype(np.uint64) << shift
+        extended[:, half + point // 64] |= bits[:, 1].astype(np.uint64) << shift
+        
+        # Representatives that disagree with the new point on each entry, as packed bitsets
+        ones, zero = ~np.uint64(0), np.uint64(0)
+        disagree = ((signatures[:, :words] ^ np.where(bits[:, :1], ones, zero)) |
+                    (signatures[:, words:] ^ np.where(bits[:, 1:], ones, zero)))
+        agreeing = pack_rows(np.ones(point, dtype=bool))
+        lowest, start = len(levels), 0
+        for depth, level in enumerate(levels[:-1], start=1):
+            agreeing &= ~np.bitwise_or.reduce(disagree[start:start + len(level)], axis=0, initial=zero)
+            start += len(level)
+            if not agreeing.any():
+                lowest = depth
+                break
+        
+        if isinstance(cache, ProgramStore):
+            cache.rows = np.zeros((len(cache.opcodes), 2 * half), dtype=np.uint64)
+            cache.rows[np.asarray(program_list, dtype=np.int64)] = extended
+        else:
+            cache = {program: row.tobytes() for program, row in zip(program_list, extended)}
+        return [(xs, ys), (ys, xs)], cache, lowest
+    
+    def carry_over(self, programs: List[Any], source: Any, cache: Any) -> List[Any]:
+        """Columnar banks are carried over row block by row block, renumbering children"""
+        if not isinstance(cache, ProgramStore):
+            return super().carry_over(programs, source, cache)
+        # Ids of the source rows in cache, kept for the run since later levels refer to earlier ones
+        carried = self.run_cache.get('carried')
+        if carried is None or carried[0] is not cache:
+            carried = self.run_cache['carried'] = (cache, np.full(source.count + 1, ProgramStore.NO_CHILD, dtype=np.int64))
+        return cache.carry(source, programs, carried[1]).tolist()
+    
+    def _point_bits(self, program_list: List[Any], cache: Any, x: float, y: float) -> np.ndarray:
+        """
+        Values of the bank entries at (x, y) and at (y, x), as an (n_programs, 2) boolean matrix
+        
+        Terminals are looked up in one `TerminalBank.membership` column pair; composites
+        combine their children's values through their opcodes, smallest programs first, so
+        children are always done before their parents.
+        """
+        structure = self._structure(program_list, cache)
+        sizes = np.asarray(self._sizes(program_list, cache))
+        terminals = np.flatnonzero(structure[:, 0] == self.TERMINAL)
+        if isinstance(cache, ProgramStore):
+            indices = cache.params[np.asarray(program_list, dtype=np.int64)[terminals]]
+        else:
+            indices = [self.terminal_bank.index(program_list[row]) for row in terminals]
+        bits = np.zeros((len(program_list), 2), dtype=bool)
+        bits[terminals] = self.terminal_bank.membership(np.array([x, y]), np.array([y, x]))[indices]
+        
+        composite = structure[:, 0] != self.TERMINAL
+        for size in np.unique(sizes[composite]):
+            rows = np.flatnonzero(composite & (sizes == size))
+            opcodes = structure[rows, 0][:, np.newaxis]
+            first, second = bits[structure[rows, 1]], bits[structure[rows, 2]]
+            # Mirror(p) holds at (x, y) and at (y, x) alike when p holds at either
+            mirrored = np.repeat(first.any(axis=1, keepdims=True), 2, axis=1)
+            bits[rows] = np.select([opcodes == self.MIRROR, opcodes == self.UNION, opcodes == self.INTERSECTION],
+                                   [mirrored, first | second, first & second], first & ~second)
+        return bits
     
     def is_correct(self, program: Shape, examples: List[Tuple[float, float, bool]]) -> bool:
         """Check if a program produces the expected output on all examples"""
         try:
-            xs = np.array([ex[0] for ex in examples])
-            ys = np.array([ex[1] for ex in examples])
-            expected = np.array([ex[2] for ex in examples])
+            xs, ys, expected = self.example_arrays(examples)
             
-            result = program.interpret(xs, ys)
-            return np.array_equal(result, expected)
+            # Fast reject on the examples that rejected recent candidates
+            recent = [index for index in self.counterexamples if index < len(expected)]
+            if recent:
+                mismatches = np.flatnonzero(program.interpret(xs[recent], ys[recent]) != expected[recent])
+                if len(mismatches):
+                    self.note_counterexample(recent[mismatches[0]])
+                    return False
+            
+            mismatches = np.flatnonzero(program.interpret(xs, ys) != expected)
+            if len(mismatches):
+                self.note_counterexample(int(mismatches[0]))
+                return False
+            return True
         except Exception:
             return False
     
-    def extract_test_inputs(self, examples: List[Tuple[float, float, bool]]) -> List[Tuple[np.ndarray, np.ndarray]]:
-        """Extract test inputs from examples for equivalence elimination"""
+    def example_arrays(self, examples: List[Tuple[float, float, bool]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The examples as (xs, ys, expected) arrays
+        
+        Inside a synthesis run they are built once per example list and kept in `run_cache`;
+        outside one they are always rebuilt, so examples edited between runs are never stale.
+        """
+        # (examples, xs, ys, expected) for the two most recent lists, so CEGIS can alternate
+        # between its subset and the full set
+        recent = [] if self.run_cache is None else self.run_cache.setdefault('example_arrays', [])
+        for prepared in recent:
+            if prepared[0] is examples:
+                return prepared[1:]
         xs = np.array([ex[0] for ex in examples])
         ys = np.array([ex[1] for ex in examples])
-        return [(xs, ys)]
+        expected = np.array([ex[2] for ex in examples])
+        prepared = (examples, xs, ys, expected)
+        if self.run_cache is not None:
+            self.run_cache['example_arrays'] = [prepared] + recent[:1]
+        return prepared[1:]
+    
+    def failing_examples(self, program: Shape, examples: List[Tuple[float, float, bool]]) -> List[int]:
+        """Indices of misclassified examples, evaluated in one compiled pass over all points"""
+        xs, ys, expected = self.example_arrays(examples)
+        return np.flatnonzero(program.compile()(xs, ys) != expected).tolist()
+    
+    def library_domain(self) -> str:
+        """Programs are fingerprinted on the coordinate domain, so each domain has its own library programs"""
+        return f"{type(self).__qualname__}/{self.max_coord}"
+    
+    def fingerprint(self, program: Shape) -> bytes:
+        """Packed membership of the half-integer grid over [0, max_coord]^2"""
+        xs, ys = np.meshgrid(np.arange(2 * self.max_coord + 1) / 2, np.arange(2 * self.max_coord + 1) / 2)
+        return pack_signature(program.interpret(xs.ravel(), ys.ravel()))
+    
+    def library_matches(self, programs: List[Shape], examples: List[Tuple[float, float, bool]]) -> np.ndarray:
+        """Evaluate all programs on the example points and compare the stacked rows with the labels at once"""
+        if not programs:
+            return np.zeros(0, dtype=bool)
+        xs, ys, expected = self.example_arrays(examples)
+        outputs = np.stack([program.interpret(xs, ys) for program in programs])
+        return np.all(outputs == expected.astype(bool), axis=1)
+    
+    def best_program(self, program_list: List[Any], examples: List[Tuple[float, float, bool]],
+                     cache: Any) -> Tuple[Shape, Tuple[int, int]]:
+        """
+        Score the whole bank from the cached signatures, a block of rows at a time
+        
+        A program misclassifies every example in the class of a representative it gets wrong,
+        so errors are weighted by class size and no program is evaluated again.
+        """
+        _, _, expected = self.example_arrays(examples)
+        wanted = expected[self.representatives].astype(bool)
+        key_words = self.key_bytes // 8
+        errors = np.empty(len(program_list), dtype=np.int64)
+        step = max(1, self.block_bytes // max(1, len(wanted)))
+        for start in range(0, len(program_list), step):
+            block = program_list[start:start + step]
+            if self.packed_signatures:
+                rows = np.ascontiguousarray(self._signature_matrix(block, cache)[:, :key_words])
+                bits = np.unpackbits(rows.view(np.uint8), axis=1, bitorder='little')[:, :len(wanted)].astype(bool)
+            else:
+                # Unpacked signatures are the outputs on the representatives
+                bits = np.array([cache[program] for program in block], dtype=bool).reshape(len(block), -1)
+            errors[start:start + step] = (bits != wanted) @ self.class_weights
+        sizes = np.asarray(self._sizes(program_list, cache))
+        best = np.lexsort((sizes, errors))[0]
+        return self.materialize(program_list[best], cache), (int(errors[best]), int(sizes[best]))
+    
+    def extract_test_inputs(self, examples: List[Tuple[float, float, bool]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Extract test inputs from examples for equivalence elimination"""
+        xs, ys, expected = self.example_arrays(examples)
+        if self.compress_examples:
+            self.representatives, classes = self.terminal_bank.point_classes(xs, ys)
+            positives = np.bincount(classes, weights=expected.astype(bool), minlength=len(self.representatives))
+            counts = np.bincount(classes, minlength=len(self.representatives))
+            conflicts = np.flatnonzero((positives > 0) & (positives < counts))
+            if len(conflicts):
+                first = self.representatives[conflicts[0]]
+                other = np.flatnonzero((classes == conflicts[0]) & (expected != expected[first]))[0]
+                raise ValueError(f"Examples {examples[first]} and {examples[other]} are on the same side of "
+                                 f"every terminal but have different labels, so no program separates them")
+            xs, ys = xs[self.representatives], ys[self.representatives]
+            # How many examples each representative stands for, to score programs on the full set
+            self.class_weights = counts
+        else:
+            self.representatives, classes = np.arange(len(xs)), np.arange(len(xs))
+            self.class_weights = np.ones(len(xs), dtype=np.int64)
+        # The class of every example, as an index into self.representatives
+        self.example_classes = classes
+        # Packed signatures on the original points occupy this many leading bytes
+        self.key_bytes = ((len(xs) + 63) // 64) * 8
+        # The swapped point set lets Mirror signatures be derived without interpretation
+        return [(xs, ys), (ys, xs)]
 
     def compute_signature(self, program: Shape, test_inputs: List[Tuple[np.ndarray, np.ndarray]]) -> Any:
         """Compute a signature for a geometric shape on test inputs for equivalence checking"""
         try:
             xs, ys = test_inputs[0]
-            return tuple(program.interpret(xs, ys))
+            result = program.interpret(xs, ys)
+            if self.packed_signatures:
+                return pack_signature(result) + pack_signature(program.interpret(ys, xs))
+            return tuple(result)
         except Exception:
             return None # Indicate failure to interpret
+    
+    def derive_signature(self, program: Shape, cache: Dict[Shape, Any], force: bool = False) -> Any:
+        """
+        Combine the packed child signatures word-wise
+        
+        Both halves (original and swapped points) combine with OR / AND / AND-NOT for the
+        binary operators; Mirror ORs the two halves of its child.
+        """
+        if not ((self.semantic_grow or force) and self.packed_signatures):
+            return None
+        if isinstance(program, Mirror):
+            child = cache.get(program.shape)
+            if child is None:
+                return None
+            child = np.frombuffer(child, dtype=np.uint64)
+            half = len(child) // 2
+            mirrored = child[:half] | child[half:]
+            return np.concatenate([mirrored, mirrored]).tobytes()
+        if not isinstance(program, (Union, Intersection, Subtraction)):
+            return None
+        first, second = cache.get(program.first), cache.get(program.second)
+        if first is None or second is None:
+            return None
+        
+        first = np.frombuffer(first, dtype=np.uint64)
+        second = np.frombuffer(second, dtype=np.uint64)
+        if isinstance(program, Union):
+            return (first | second).tobytes()
+        if isinstance(program, Intersection):
+            return (first & second).tobytes()
+        return (first & ~second).tobytes()
+    
+    def equivalence_key(self, signature: Any) -> Any:
+        """Only the original points decide equivalence; the swapped half is carried along"""
+        if not self.packed_signatures:
+            return signature
+        return signature[:self.key_bytes]
+    
+    def target_signature(self, examples: List[Tuple[float, float, bool]], 
+                         test_inputs: List[Tuple[np.ndarray, np.ndarray]]) -> Any:
+        """Packed expected labels, so correctness is a single comparison against the cached signature"""
+        if not self.packed_signatures:
+            return None
+        _, _, expected = self.example_arrays(examples)
+        return pack_signature(expected[self.representatives].astype(bool))
+
+class ShapeBank:
+    """
+    Programs enumerated once over a fixed point set, reused for every labelling of those points
+    
+    Enumeration and equivalence elimination only depend on the points, never on the labels,
+    so the bank grows `depth` levels once and indexes every program by its signature. A
+    labelling is then answered by a lookup of its target signature in that index and, on a
+    miss, by the goal-directed search of one more level over the stored signatures
+    (`ShapeSynthesizer.find_final`). The answer is the program that
+    `ShapeSynthesizer.synthesize(examples, max_iterations=depth + 1)` returns for the same
+    points and labels.
+    """
+    
+    def __init__(self, xs: np.ndarray, ys: np.ndarray, depth: int = 2,
+                 synthesizer: Optional[ShapeSynthesizer] = None, workers: int = 1):
+        """
+        Enumerate the bank
+        
+        Args:
+            xs, ys: Coordinates of the points every labelling refers to
+            depth: Number of growth levels stored in the bank
+            synthesizer: Configured ShapeSynthesizer (packed signatures) owned by the bank from now on
+            workers: Number of worker processes used to grow the levels
+        """
+        self.synthesizer = synthesizer if synthesizer is not None else ShapeSynthesizer()
+        if not self.synthesizer.packed_signatures:
+            raise ValueError("ShapeBank needs a synthesizer with packed signatures")
+        self.xs, self.ys = np.asarray(xs), np.asarray(ys)
+        self.depth = depth
+        
+        synthesizer = self.synthesizer
+        # Labels play no part in enumeration; all-negative ones can never conflict within a class
+        examples = [(x, y, False) for x, y in zip(self.xs.tolist(), self.ys.tolist())]
+        test_inputs = synthesizer.extract_test_inputs(examples)
+        self.cache = synthesizer.create_cache(test_inputs)
+        self.programs: List[Any] = []
+        synthesizer.workers = workers
+        synthesizer.pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            for iteration in range(depth + 1):
+                if iteration == 0:
+                    self.programs += list(synthesizer.unique_terminals(examples, test_inputs, self.cache))
+                else:
+                    self.programs += list(synthesizer.grow_unique(self.programs, examples, test_inputs,
+                                                                  self.cache, iteration))
+        finally:
+            if synthesizer.pool is not None:
+                synthesizer.pool.shutdown(cancel_futures=True)
+                synthesizer.pool = None
+        
+        self.signatures = synthesizer._signature_matrix(self.programs, self.cache)
+        self.sizes = np.asarray(synthesizer._sizes(self.programs, self.cache))
+        key_words = synthesizer.key_bytes // 8
+        # Equivalence elimination leaves one program per signature, the smallest in enumeration order
+        self.index = {row.tobytes(): position for position, row in enumerate(self.signatures[:, :key_words])}
+    
+    def __len__(self) -> int:
+        return len(self.programs)
+    
+    def synthesize(self, labels: np.ndarray) -> Shape:
+        """
+        A program that contains exactly the points labelled True
+        
+        Raises:
+            ValueError: if points no program tells apart have different labels, or no program
+                within depth + 1 levels matches the labels
+        """
+        synthesizer = self.synthesizer
+        labels = np.asarray(labels, dtype=bool)
+        if labels.shape != self.xs.shape:
+            raise ValueError(f"Expected {len(self.xs)} labels, got {labels.size}")
+        # Every point must agree with the representative of its class
+        representative_labels = labels[synthesizer.representatives]
+        conflicts = np.flatnonzero(representative_labels[synthesizer.example_classes] != labels)
+        if len(conflicts):
+            first = synthesizer.representatives[synthesizer.example_classes[conflicts[0]]]
+            raise ValueError(f"Points {first} and {conflicts[0]} are on the same side of every terminal "
+                             f"but have different labels, so no program separates them")
+        
+        target = pack_rows(representative_labels)
+        position = self.index.get(target.tobytes())
+        if position is not None:
+            return synthesizer.materialize(self.programs[position], self.cache)
+        
+        found = synthesizer.find_final(self.signatures, target, self.sizes)
+        if found is None:
+            raise ValueError(f"No program found within {self.depth + 1} iterations")
+        opcode, first, second = found[:3]
+        children = [None if row is None else synthesizer.materialize(self.programs[row], self.cache)
+                    for row in (first, second)]
+        return synthesizer._build(opcode, ProgramStore.NO_CHILD, *children)
@@ -9,21 +9,56 @@ from dataclasses import dataclass
 import matplotlib.pyplot as plt
 import os
 import inspect
+from typing import Optional, Tuple
+from interning import HashConsedNode
 
+# Default upper end of the coordinate domain; ShapeSynthesizer(max_coord=...) enumerates a larger one
 MAX_COORD = 9
 
+# Points evaluated per chunk by compiled shapes, sized so the buffer pool stays in cache
+CHUNK_SIZE = 1 << 14
+
+# Bounding box (x0, y0, x1, y1) of a shape that contains no point; it hulls and intersects like any other box
+EMPTY_BOUNDS = (np.inf, np.inf, -np.inf, -np.inf)
+
+def bounds_union(first: Tuple[float, ...], second: Tuple[float, ...]) -> Tuple[float, ...]:
+    """Smallest box containing both boxes"""
+    return (min(first[0], second[0]), min(first[1], second[1]), max(first[2], second[2]), max(first[3], second[3]))
+
+def bounds_intersection(first: Tuple[float, ...], second: Tuple[float, ...]) -> Tuple[float, ...]:
+    """Overlap of both boxes, or EMPTY_BOUNDS if they are disjoint"""
+    box = (max(first[0], second[0]), max(first[1], second[1]), min(first[2], second[2]), min(first[3], second[3]))
+    return box if box[0] <= box[2] and box[1] <= box[3] else EMPTY_BOUNDS
+
+def bounds_disjoint(first: Tuple[float, ...], second: Tuple[float, ...]) -> bool:
+    """Whether two closed boxes share no point"""
+    return bounds_intersection(first, second) is EMPTY_BOUNDS
+
 @dataclass(frozen=True)
 class Coordinate:
-    """Represents a 2D coordinate with integer values in range [0, MAX_COORD]"""
+    """Represents a 2D coordinate with non-negative integer values (in [0, MAX_COORD] by default)"""
     x: int
     y: int
     
     def __post_init__(self):
-        assert 0 <= self.x <= MAX_COORD, f"x coordinate {self.x} out of range"
-        assert 0 <= self.y <= MAX_COORD, f"y coordinate {self.y} out of range"
+        assert 0 <= self.x, f"x coordinate {self.x} out of range"
+        assert 0 <= self.y, f"y coordinate {self.y} out of range"
 
-class Shape(ABC):
-    """Abstract base class for all shapes in our DSL"""
+class Shape(HashConsedNode, ABC):
+    """
+    Abstract base class for all shapes in our DSL
+
+    Shapes are hash-consed: constructing a structurally equal shape returns the existing
+    instance, so hashing is a cached lookup and equality is identity. Every shape also
+    carries `bounds`, a closed axis-aligned box (x0, y0, x1, y1) containing every point the
+    shape contains, computed once at construction: exact for terminals and combined from
+    the children's boxes for composites. `order_key` is a structural sort key, likewise
+    computed once: (size, kind, parameters) for terminals and (size, kind, first child's
+    key, second child's key) for composites. It depends only on the expression, so it
+    orders the operands of commutative operators the same way in every process.
+    """
+
+    __slots__ = ('bounds', 'order_key')
     
     @abstractmethod
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
@@ -31,172 +66,422 @@ class Shape(ABC):
         pass
     
     @abstractmethod
-    def __str__(self) -> str:
+    def size(self) -> int:
+        """Number of nodes in the shape expression"""
         pass
     
     @abstractmethod
-    def __hash__(self) -> int:
+    def __str__(self) -> str:
         pass
     
-    @abstractmethod
-    def __eq__(self, other) -> bool:
-        pass
+    def compile(self, chunk_size: int = CHUNK_SIZE) -> 'CompiledShape':
+        """Flatten the shape into a CompiledShape for fast evaluation on large point sets"""
+        return CompiledShape(self, chunk_size)
 
 class Rectangle(Shape):
     """Rectangle shape defined by bottom-left and top-right coordinates"""
     
+    __slots__ = ('bottom_left', 'top_right')
+    
     def __init__(self, bottom_left: Coordinate, top_right: Coordinate):
         assert bottom_left.x < top_right.x and bottom_left.y < top_right.y, \
             "bottom_left must be below and to the left of top_right"
         self.bottom_left = bottom_left
         self.top_right = top_right
+        self.bounds = (bottom_left.x, bottom_left.y, top_right.x, top_right.y)
+        self.order_key = (1, 0) + self.bounds
     
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
         return ((self.bottom_left.x <= xs) & (xs <= self.top_right.x) &
                 (self.bottom_left.y <= ys) & (ys <= self.top_right.y))
     
+    def size(self) -> int:
+        return 1
+    
     def __str__(self) -> str:
         return f"Rect({self.bottom_left.x},{self.bottom_left.y},{self.top_right.x},{self.top_right.y})"
-    
-    def __hash__(self) -> int:
-        return hash(('rect', self.bottom_left.x, self.bottom_left.y, self.top_right.x, self.top_right.y))
-    
-    def __eq__(self, other) -> bool:
-        return (isinstance(other, Rectangle) and 
-                self.bottom_left == other.bottom_left and 
-                self.top_right == other.top_right)
 
 class Triangle(Shape):
     """Right triangle shape defined by bottom-left and top-right coordinates"""
     
+    __slots__ = ('bottom_left', 'top_right')
+    
     def __init__(self, bottom_left: Coordinate, top_right: Coordinate):
         assert bottom_left.x < top_right.x and bottom_left.y < top_right.y, \
             "bottom_left must be below and to the left of top_right"
         self.bottom_left = bottom_left
         self.top_right = top_right
+        self.bounds = (bottom_left.x, bottom_left.y, top_right.x, top_right.y)
+        self.order_key = (1, 1) + self.bounds
     
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
         width = self.top_right.x - self.bottom_left.x
         height = self.top_right.y - self.bottom_left.y
-        m = height / width
-        b = self.bottom_left.y - m * self.bottom_left.x
         
-        below_line = ys <= m * xs + b
+        # Cross-multiplied form of ys <= m * xs + b, exact for integer corners
+        below_line = (ys - self.bottom_left.y) * width <= height * (xs - self.bottom_left.x)
         return ((self.bottom_left.x <= xs) & (xs <= self.top_right.x) &
                 (self.bottom_left.y <= ys) & (ys <= self.top_right.y) &
                 below_line)
     
+    def size(self) -> int:
+        return 1
+    
     def __str__(self) -> str:
         return f"Triangle({self.bottom_left.x},{self.bottom_left.y},{self.top_right.x},{self.top_right.y})"
-    
-    def __hash__(self) -> int:
-        return hash(('triangle', self.bottom_left.x, self.bottom_left.y, self.top_right.x, self.top_right.y))
-    
-    def __eq__(self, other) -> bool:
-        return (isinstance(other, Triangle) and 
-                self.bottom_left == other.bottom_left and 
-                self.top_right == other.top_right)
 
 class Circle(Shape):
     """Circle shape defined by center coordinate and radius"""
     
+    __slots__ = ('center', 'radius')
+    
     def __init__(self, center: Coordinate, radius: int):
-        assert 1 <= radius <= MAX_COORD, f"radius {radius} out of range"
+        assert 1 <= radius, f"radius {radius} out of range"
         self.center = center
         self.radius = radius
+        self.bounds = (center.x - radius, center.y - radius, center.x + radius, center.y + radius)
+        self.order_key = (1, 2, center.x, center.y, radius)
     
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
         return ((xs - self.center.x)**2 + (ys - self.center.y)**2) <= self.radius**2
     
+    def size(self) -> int:
+        return 1
+    
     def __str__(self) -> str:
         return f"Circle({self.center.x},{self.center.y},{self.radius})"
-    
-    def __hash__(self) -> int:
-        return hash(('circle', self.center.x, self.center.y, self.radius))
-    
-    def __eq__(self, other) -> bool:
-        return (isinstance(other, Circle) and 
-                self.center == other.center and 
-                self.radius == other.radius)
 
 class Union(Shape):
     """Union of two shapes"""
     
+    __slots__ = ('first', 'second')
+    
     def __init__(self, first: Shape, second: Shape):
         self.first = first
         self.second = second
+        self.bounds = bounds_union(first.bounds, second.bounds)
+        self.order_key = (1 + first.order_key[0] + second.order_key[0], 3, first.order_key, second.order_key)
     
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
         return self.first.interpret(xs, ys) | self.second.interpret(xs, ys)
     
+    def size(self) -> int:
+        return 1 + self.first.size() + self.second.size()
+    
     def __str__(self) -> str:
         return f"Union({self.first}, {self.second})"
-    
-    def __hash__(self) -> int:
-        return hash(('union', hash(self.first), hash(self.second)))
-    
-    def __eq__(self, other) -> bool:
-        return (isinstance(other, Union) and 
-                self.first == other.first and 
-                self.second == other.second)
 
 class Intersection(Shape):
     """Intersection of two shapes"""
     
+    __slots__ = ('first', 'second')
+    
     def __init__(self, first: Shape, second: Shape):
         self.first = first
         self.second = second
+        self.bounds = bounds_intersection(first.bounds, second.bounds)
+        self.order_key = (1 + first.order_key[0] + second.order_key[0], 4, first.order_key, second.order_key)
     
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
         return self.first.interpret(xs, ys) & self.second.interpret(xs, ys)
     
+    def size(self) -> int:
+        return 1 + self.first.size() + self.second.size()
+    
     def __str__(self) -> str:
         return f"Intersection({self.first}, {self.second})"
-    
-    def __hash__(self) -> int:
-        return hash(('intersection', hash(self.first), hash(self.second)))
-    
-    def __eq__(self, other) -> bool:
-        return (isinstance(other, Intersection) and 
-                self.first == other.first and 
-                self.second == other.second)
 
 class Mirror(Shape):
     """Mirror a shape across the line y=x"""
     
+    __slots__ = ('shape',)
+    
     def __init__(self, shape: Shape):
         self.shape = shape
+        # The shape's box hulled with its transpose
+        x0, y0, x1, y1 = shape.bounds
+        low, high = min(x0, y0), max(x1, y1)
+        self.bounds = (low, low, high, high) if low <= high else EMPTY_BOUNDS
+        self.order_key = (1 + shape.order_key[0], 5, shape.order_key)
     
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
         return self.shape.interpret(xs, ys) | self.shape.interpret(ys, xs)
     
+    def size(self) -> int:
+        return 1 + self.shape.size()
+    
     def __str__(self) -> str:
         return f"Mirror({self.shape})"
-    
-    def __hash__(self) -> int:
-        return hash(('mirror', hash(self.shape)))
-    
-    def __eq__(self, other) -> bool:
-        return isinstance(other, Mirror) and self.shape == other.shape
 
 class Subtraction(Shape):
     """Subtraction of two shapes"""
     
+    __slots__ = ('first', 'second')
+    
     def __init__(self, first: Shape, second: Shape):
         self.first = first
         self.second = second
+        # Subtracting only removes points
+        self.bounds = first.bounds
+        self.order_key = (1 + first.order_key[0] + second.order_key[0], 6, first.order_key, second.order_key)
     
     def interpret(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
         return self.first.interpret(xs, ys) & ~self.second.interpret(xs, ys)
     
+    def size(self) -> int:
+        return 1 + self.first.size() + self.second.size()
+    
     def __str__(self) -> str:
         return f"Subtraction({self.first}, {self.second})"
-    
-    def __hash__(self) -> int:
-        return hash(('subtraction', hash(self.first), hash(self.second)))
-    
-    def __eq__(self, other) -> bool:
-        return isinstance(other, Subtraction) and self.first == other.first and self.second == other.second
+
+def is_redundant(operator: type, first: Shape, second: Optional[Shape] = None) -> bool:
+    """
+    Whether operator(first, second) always equals a smaller shape, or is always empty
+    
+    Such a candidate never needs to be built: bottom-up enumeration has already produced
+    the smaller shape (it is the candidate's operand or an operand's child), so the
+    candidate could only be discarded as a duplicate. The rules, in either operand order
+    for Union and Intersection:
+    
+        Mirror(Mirror(a)) = Mirror(a)               Mirror(a) already contains a's mirror image
+        Union(a, a) = Intersection(a, a) = a        idempotence
+        Subtraction(a, a) = empty
+        Union(a, Intersection(a, b)) = a            absorption, and likewise
+        Union(a, Subtraction(a, b)) = a             Union(a, Union(a, b)) = Union(a, b)
+        Intersection(a, Union(a, b)) = a            Intersection(a, Intersection(a, b)) = Intersection(a, b)
+        Intersection(a, Subtraction(a, b)) = Subtraction(a, b)
+        Union(a, Mirror(a)) = Mirror(a)             Intersection(a, Mirror(a)) = a
+        Subtraction(Subtraction(a, b), b) = Subtraction(a, b)
+        Subtraction(a, Union(a, b)), Subtraction(a, Mirror(a)), Subtraction(Intersection(a, b), a)
+        and Subtraction(Subtraction(a, b), a) are empty
+        Intersection(a, b) is empty and Subtraction(a, b) = a   when the bounding boxes are disjoint
+    """
+    if operator is Mirror:
+        return isinstance(first, Mirror)
+    if first is second:
+        return True
+    if operator is Union:
+        return _absorbs(operator, first, second) or _absorbs(operator, second, first)
+    if operator is Intersection:
+        return (bounds_disjoint(first.bounds, second.bounds) or
+                _absorbs(operator, first, second) or _absorbs(operator, second, first))
+    if operator is Subtraction:
+        return (bounds_disjoint(first.bounds, second.bounds) or
+                (isinstance(first, Subtraction) and (first.second is second or first.first is second)) or
+                (isinstance(first, Intersection) and (first.first is second or first.second is second)) or
+                (isinstance(second, Union) and (second.first is first or second.second is first)) or
+                (isinstance(second, Mirror) and second.shape is first))
+    return False
+
+def _absorbs(operator: type, operand: Shape, other: Shape) -> bool:
+    """Whether operator(operand, other) reduces because other is built directly on operand"""
+    if isinstance(other, Mirror):
+        return other.shape is operand
+    if isinstance(other, (Union, Intersection)):
+        return other.first is operand or other.second is operand
+    if isinstance(other, Subtraction):
+        return other.first is operand
+    return False
+
+def commutative_operands(first: Shape, second: Shape) -> Tuple[Shape, Shape]:
+    """Operands of a Union or Intersection in their fixed order, by `Shape.order_key`"""
+    if second.order_key < first.order_key:
+        return second, first
+    return first, second
+
+def canonical(operator: type, first: Shape, second: Optional[Shape] = None) -> Optional[Shape]:
+    """
+    Canonicalizing constructor: operator applied to first (and second), or None if redundant
+    
+    Returns None whenever `is_redundant` holds. Operands of the commutative Union and
+    Intersection are put in `commutative_operands` order, as the synthesizer builds them,
+    so both spellings of the same expression produce a single interned node.
+    """
+    if is_redundant(operator, first, second):
+        return None
+    if second is None:
+        return operator(first)
+    if operator in (Union, Intersection):
+        first, second = commutative_operands(first, second)
+    return operator(first, second)
+
+class CompiledShape:
+    """
+    A shape flattened into a linear instruction list
+
+    Every instruction writes one boolean register of a fixed-size buffer pool using numpy
+    `out=` arguments. Repeated subtrees (the same hash-consed node on the same coordinate
+    order) are emitted once, Mirror is compiled away by evaluating its operand on swapped
+    coordinates, and a register returns to the pool as soon as its last reader has run.
+    Points are processed in chunks, so memory is a few chunk-sized buffers regardless of
+    the size of the input or the depth of the tree. Points outside the shape's bounding box
+    are answered False up front and never reach the instructions.
+    """
+
+    RECTANGLE, TRIANGLE, CIRCLE, INTERPRET, OR, AND, AND_NOT = range(7)
+
+    def __init__(self, shape: Shape, chunk_size: int = CHUNK_SIZE):
+        self.shape = shape
+        self.chunk_size = chunk_size
+
+        # Straight-line program over values: (opcode, operand values, parameter, swapped)
+        program = []
+        self._emit(shape, False, program, {}, {})
+
+        # Assign registers, releasing each value's register after its last use
+        last_use = {}
+        for index, (_, operands, _, _) in enumerate(program):
+            for value in operands:
+                last_use[value] = index
+        registers, free = [], []
+        self.n_registers = 0
+        # (opcode, destination register, source registers, parameter, swapped)
+        self.instructions = []
+        for index, (opcode, operands, param, swapped) in enumerate(program):
+            sources = tuple(registers[value] for value in operands)
+            for value in set(operands):
+                if last_use[value] == index:
+                    free.append(registers[value])
+            if free:
+                destination = free.pop()
+            else:
+                destination = self.n_registers
+                self.n_registers += 1
+            registers.append(destination)
+            self.instructions.append((opcode, destination, sources, param, swapped))
+        self.result = registers[-1]
+
+    def _emit(self, node: Shape, swapped: bool, program: list, values: dict, needs: dict) -> int:
+        """Append the instructions computing node to program and return its value index"""
+        key = (node, swapped)
+        if key in values:
+            return values[key]
+
+        if isinstance(node, Mirror):
+            opcode, param = self.OR, None
+            operands = (self._emit(node.shape, swapped, program, values, needs),
+                        self._emit(node.shape, not swapped, program, values, needs))
+        elif isinstance(node, (Union, Intersection, Subtraction)):
+            opcode = {Union: self.OR, Intersection: self.AND, Subtraction: self.AND_NOT}[type(node)]
+            param = None
+            # Evaluate the operand needing more registers first (Sethi-Ullman order)
+            if self._need(node.second, needs) > self._need(node.first, needs):
+                second = self._emit(node.second, swapped, program, values, needs)
+                first = self._emit(node.first, swapped, program, values, needs)
+            else:
+                first = self._emit(node.first, swapped, program, values, needs)
+                second = self._emit(node.second, swapped, program, values, needs)
+            operands = (first, second)
+        elif isinstance(node, (Rectangle, Triangle)):
+            opcode = self.RECTANGLE if isinstance(node, Rectangle) else self.TRIANGLE
+            param = (node.bottom_left.x, node.bottom_left.y, node.top_right.x, node.top_right.y)
+            operands = ()
+        elif isinstance(node, Circle):
+            opcode, param, operands = self.CIRCLE, (node.center.x, node.center.y, node.radius ** 2), ()
+        else:
+            # Shapes without a kernel fall back to their own interpretation
+            opcode, param, operands = self.INTERPRET, node, ()
+
+        program.append((opcode, operands, param, swapped))
+        values[key] = len(program) - 1
+        return values[key]
+
+    def _need(self, node: Shape, needs: dict) -> int:
+        """Number of registers needed to evaluate node without spilling"""
+        if node not in needs:
+            if isinstance(node, Mirror):
+                needs[node] = self._need(node.shape, needs) + 1
+            elif isinstance(node, (Union, Intersection, Subtraction)):
+                first, second = self._need(node.first, needs), self._need(node.second, needs)
+                needs[node] = max(first, second) if first != second else first + 1
+            else:
+                needs[node] = 1
+        return needs[node]
+
+    def __call__(self, xs: np.ndarray, ys: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Evaluate the shape at the given coordinates, equivalent to shape.interpret(xs, ys)
+
+        out, if given, is a C-contiguous boolean array of the shape of xs that receives the
+        result; the results are written through a flat view of it.
+        """
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        shape = xs.shape
+        xs, ys = xs.ravel(), ys.ravel()
+        if out is None:
+            out = np.empty(shape, dtype=bool)
+        elif out.shape != shape or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous array of shape {shape}")
+        flat_out = out.reshape(-1)
+
+        # Only points inside the bounding box can be in the shape; the rest are evaluated by this test alone
+        x0, y0, x1, y1 = self.shape.bounds
+        inside = (x0 <= xs) & (xs <= x1) & (y0 <= ys) & (ys <= y1)
+        points = None
+        if not inside.all():
+            flat_out[:] = False
+            points = np.flatnonzero(inside)
+            xs, ys = xs[points], ys[points]
+
+        n_points = len(xs)
+        width = max(1, min(self.chunk_size, n_points))
+        dtype = np.result_type(xs, ys)
+        if not np.issubdtype(dtype, np.floating):
+            dtype = np.float64
+        registers = np.empty((max(self.n_registers, 1), width), dtype=bool)
+        mask_buffer = np.empty(width, dtype=bool)
+        u_buffer, v_buffer = np.empty(width, dtype=dtype), np.empty(width, dtype=dtype)
+
+        for start in range(0, n_points, width):
+            stop = min(start + width, n_points)
+            size = stop - start
+            chunk_xs, chunk_ys = xs[start:stop], ys[start:stop]
+            regs = [register[:size] for register in registers]
+            mask, u, v = mask_buffer[:size], u_buffer[:size], v_buffer[:size]
+
+            for opcode, destination, sources, param, swapped in self.instructions:
+                d = regs[destination]
+                x, y = (chunk_ys, chunk_xs) if swapped else (chunk_xs, chunk_ys)
+                if opcode == self.OR:
+                    np.logical_or(regs[sources[0]], regs[sources[1]], out=d)
+                elif opcode == self.AND:
+                    np.logical_and(regs[sources[0]], regs[sources[1]], out=d)
+                elif opcode == self.AND_NOT:
+                    # a & ~b on booleans is a > b
+                    np.greater(regs[sources[0]], regs[sources[1]], out=d)
+                elif opcode == self.CIRCLE:
+                    cx, cy, radius_squared = param
+                    np.subtract(x, cx, out=u)
+                    np.multiply(u, u, out=u)
+                    np.subtract(y, cy, out=v)
+                    np.multiply(v, v, out=v)
+                    np.add(u, v, out=u)
+                    np.less_equal(u, radius_squared, out=d)
+                elif opcode == self.INTERPRET:
+                    d[...] = param.interpret(x, y)
+                else:
+                    x0, y0, x1, y1 = param
+                    np.greater_equal(x, x0, out=d)
+                    np.less_equal(x, x1, out=mask)
+                    np.logical_and(d, mask, out=d)
+                    np.greater_equal(y, y0, out=mask)
+                    np.logical_and(d, mask, out=d)
+                    np.less_equal(y, y1, out=mask)
+                    np.logical_and(d, mask, out=d)
+                    if opcode == self.TRIANGLE:
+                        # Same cross-multiplied test as Triangle.interpret
+                        np.subtract(y, y0, out=u)
+                        np.multiply(u, x1 - x0, out=u)
+                        np.subtract(x, x0, out=v)
+                        np.multiply(v, y1 - y0, out=v)
+                        np.less_equal(u, v, out=mask)
+                        np.logical_and(d, mask, out=d)
+
+            if points is None:
+                flat_out[start:stop] = regs[self.result]
+            else:
+                flat_out[points[start:stop]] = regs[self.result]
+        return out
 
 class ShapeVisualizer:
     """Visualization tools for shape synthesis results."""
@@ -284,8 +569,7 @@ class ShapeVisualizer:
         
         # Evaluate the program on the grid
         try:
-            Z = program.interpret(X.flatten(), Y.flatten())
-            Z = Z.reshape(X.shape)
+            Z = program.compile()(X, Y)
             
             # Plot the synthesized shape
             ax.contourf(X, Y, Z, levels=[0, 0.5, 1], 
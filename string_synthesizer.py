@@ -1,10 +1,13 @@
-from typing import List, Tuple, Any
-from tqdm import tqdm
+from typing import List, Tuple, Dict, Any
 
 from enumerative_synthesis import BottomUpSynthesizer
 from strings import StringExpression, StringLiteral, InputString, Concatenate
 # TODO: import other used string operations here
 
+# Inputs that library programs are fingerprinted on: names, dates, paths, punctuation, case and padding
+PROBE_INPUTS = ["", "a", "John Smith", "jane.doe@example.com", "2024-01-15", "Hello, World!",
+                "  padded  ", "x_y-z/w", "UPPER lower 123", "Dr. Mary Ann O'Neil"]
+
 class StringSynthesizer(BottomUpSynthesizer[StringExpression]):
     """Bottom-up enumerative synthesizer for string expressions"""
     
@@ -31,7 +34,7 @@ class StringSynthesizer(BottomUpSynthesizer[StringExpression]):
         terminals.append(InputString())
         
         # Add common string literals
-        for literal in tqdm(self.common_literals, desc="Common literals", unit="literal"):
+        for literal in self.common_literals:
             appeared = False
             for (input, output) in examples:
                 if literal in output:
@@ -66,14 +69,47 @@ class StringSynthesizer(BottomUpSynthesizer[StringExpression]):
     def is_correct(self, program: StringExpression, examples: List[Tuple[str, str]]) -> bool:
         """Check if a program produces the expected output on all examples"""
         try:
-            for input_str, expected_output in examples:
+            # Examples that rejected recent candidates are the likeliest to reject this one
+            for index in self.example_order(len(examples)):
+                input_str, expected_output = examples[index]
                 result = program.interpret(input_str)
                 if result != expected_output:
+                    self.note_counterexample(index)
                     return False
             return True
         except Exception:
             return False
     
+    def failing_examples(self, program: StringExpression, examples: List[Tuple[str, str]]) -> List[int]:
+        """Indices of the examples the program gets wrong, or fails to run on"""
+        failing = []
+        for index, (input_str, expected_output) in enumerate(examples):
+            try:
+                if program.interpret(input_str) != expected_output:
+                    failing.append(index)
+            except Exception:
+                failing.append(index)
+        return failing
+    
+    def best_program(self, program_list: List[StringExpression], examples: List[Tuple[str, str]],
+                     cache: Dict[StringExpression, Any]) -> Tuple[StringExpression, Tuple[int, int]]:
+        """Score the bank from the cached outputs, which are the outputs on the examples in order"""
+        expected = [output for _, output in examples]
+        scores = [(sum(output != wanted for output, wanted in zip(cache[program], expected)), program.size())
+                  for program in program_list]
+        best = min(range(len(program_list)), key=scores.__getitem__)
+        return program_list[best], scores[best]
+    
+    def fingerprint(self, program: StringExpression) -> bytes:
+        """The outputs on PROBE_INPUTS, with None where the program fails"""
+        outputs = []
+        for probe in PROBE_INPUTS:
+            try:
+                outputs.append(program.interpret(probe))
+            except Exception:
+                outputs.append(None)
+        return repr(outputs).encode()
+    
     def extract_test_inputs(self, examples: List[Tuple[str, str]]) -> List[str]:
         """Extract test inputs from examples for equivalence elimination"""
         return [ex[0] for ex in examples]
@@ -5,9 +5,17 @@ This module defines the domain-specific language for string transformations.
 
 from abc import ABC, abstractmethod
 from typing import List, Tuple
+from interning import HashConsedNode
 
-class StringExpression(ABC):
-    """Abstract base class for all string expressions in our DSL"""
+class StringExpression(HashConsedNode, ABC):
+    """
+    Abstract base class for all string expressions in our DSL
+
+    Expressions are hash-consed: constructing a structurally equal expression returns the
+    existing instance, so hashing is a cached lookup and equality is identity.
+    """
+
+    __slots__ = ()
     
     @abstractmethod
     def interpret(self, input_string: str) -> str:
@@ -18,17 +26,15 @@ class StringExpression(ABC):
     def __str__(self) -> str:
         pass
     
-    @abstractmethod
-    def __hash__(self) -> int:
-        pass
-    
-    @abstractmethod
-    def __eq__(self, other) -> bool:
-        pass
+    def size(self) -> int:
+        """Number of nodes in the expression"""
+        return 1 + sum(arg.size() for arg in self._args if isinstance(arg, StringExpression))
 
 class StringLiteral(StringExpression):
     """A literal string constant"""
     
+    __slots__ = ('value',)
+    
     def __init__(self, value: str):
         self.value = value
     
@@ -37,31 +43,23 @@ class StringLiteral(StringExpression):
     
     def __str__(self) -> str:
         return f'"{self.value}"'
-    
-    def __hash__(self) -> int:
-        return hash(('literal', self.value))
-    
-    def __eq__(self, other) -> bool:
-        return isinstance(other, StringLiteral) and self.value == other.value
 
 class InputString(StringExpression):
     """Reference to the input string"""
     
+    __slots__ = ()
+    
     def interpret(self, input_string: str) -> str:
         return input_string
     
     def __str__(self) -> str:
         return "input"
-    
-    def __hash__(self) -> int:
-        return hash('input')
-    
-    def __eq__(self, other) -> bool:
-        return isinstance(other, InputString)
 
 class Concatenate(StringExpression):
     """Concatenation of two string expressions"""
     
+    __slots__ = ('left', 'right')
+    
     def __init__(self, left: StringExpression, right: StringExpression):
         self.left = left
         self.right = right
@@ -71,13 +69,6 @@ class Concatenate(StringExpression):
     
     def __str__(self) -> str:
         return f"Concat({self.left}, {self.right})"
-    
-    def __hash__(self) -> int:
-        return hash(('concat', hash(self.left), hash(self.right)))
-    
-    def __eq__(self, other) -> bool:
-        return (isinstance(other, Concatenate) and 
-                self.left == other.left and self.right == other.right)
 
 #####################################################################################################
 #                                                                                                   #
@@ -87,7 +78,7 @@ class Concatenate(StringExpression):
 #                                                                                                   #
 # NOTE: Each operation should be implemented as a class that inherits from StringExpression,        #
 #       similar to StringLiteral, InputString, and Concatenate. The `interpret` function encodes    #
-#       semantics of the operation. `__str__`, `__hash__`, and `__eq__` are helper functions that   #
-#       need to be implemented for the synthesizer to work correctly.                               #
+#       semantics of the operation. `__str__` is a helper function that needs to be implemented;    #
+#       `__hash__` and `__eq__` come from hash-consing in StringExpression and need not be written. #
 #                                                                                                   #
 #####################################################################################################
@@ -357,6 +357,521 @@ class TestPart1Shapes(unittest.TestCase):
             # Synthesis might fail, which is acceptable for some complex cases
             self.fail(f"Synthesis failed for {test_name}: {e}")
 
+class TestShapeSynthesizerEngine(unittest.TestCase):
+    """Test cases for the shape synthesizer internals"""
+    
+    # Solved at the second level of growth
+    examples = [(3, 6, True), (9, 2, False), (4, 9, True), (9, 1, True), (7, 5, False), (5, 6, True), (9, 4, True)]
+    storage_options = ({}, {'columnar': False}, {'packed_signatures': False})
+    
+    @classmethod
+    def setUpClass(cls):
+        from shape_synthesizer import ShapeSynthesizer
+        cls.ShapeSynthesizer = ShapeSynthesizer
+    
+    def test_packed_signature_roundtrip(self):
+        from shape_synthesizer import pack_signature, unpack_signature
+        mask = np.array([True, False, True] * 30)
+        signature = pack_signature(mask)
+        self.assertEqual(len(signature), 16)
+        np.testing.assert_array_equal(unpack_signature(signature, len(mask)), mask)
+    
+    def test_packed_and_tuple_signatures_agree(self):
+        from shape_synthesizer import ShapeSynthesizer
+        examples = [(0, 0, False), (1, 1, True), (2, 2, True), (3, 3, False)]
+        packed = ShapeSynthesizer().synthesize(examples, max_iterations=1)
+        unpacked = ShapeSynthesizer(packed_signatures=False).synthesize(examples, max_iterations=1)
+        self.assertEqual(packed, unpacked)
+    
+    def test_derived_signatures_match_interpretation(self):
+        from shape_synthesizer import ShapeSynthesizer
+        xs, ys, out = random_test(3, 20)
+        synthesizer = ShapeSynthesizer()
+        test_inputs = synthesizer.extract_test_inputs(list(zip(xs, ys, out)))
+        first, second = Circle(Coordinate(4, 4), 3), Rectangle(Coordinate(2, 1), Coordinate(7, 5))
+        cache = {shape: synthesizer.compute_signature(shape, test_inputs) for shape in (first, second)}
+        for program in (Union(first, second), Intersection(first, second), Subtraction(first, second),
+                        Mirror(second)):
+            self.assertEqual(synthesizer.derive_signature(program, cache),
+                             synthesizer.compute_signature(program, test_inputs))
+    
+    def test_batched_grow_matches_nested_loop_grow(self):
+        from shape_synthesizer import ShapeSynthesizer
+        xs, ys, out = half_circle_test(2, 3, 1)
+        examples = list(zip(xs, ys, out))
+        batched = ShapeSynthesizer(block_bytes=4096).synthesize(examples, max_iterations=2)
+        nested = ShapeSynthesizer(batched_grow=False).synthesize(examples, max_iterations=2)
+        self.assertEqual(batched, nested)
+    
+    def test_grow_streams_smallest_programs_first(self):
+        from shape_synthesizer import ShapeSynthesizer
+        bank = [Circle(Coordinate(2, 2), 1), Union(Circle(Coordinate(5, 5), 2), Rectangle(Coordinate(0, 0), Coordinate(1, 1))),
+                Rectangle(Coordinate(3, 3), Coordinate(4, 6)), Mirror(Triangle(Coordinate(0, 0), Coordinate(2, 4)))]
+        grown = ShapeSynthesizer().grow(bank, [])
+        self.assertNotIsInstance(grown, list)
+        sizes = [program.size() for program in list(grown)[len(bank):]]
+        self.assertEqual(sizes, sorted(sizes))
+        # 3 mirrors (Mirror(Mirror(...)) is redundant), 6 unions, 6 intersections and 12 subtractions
+        self.assertEqual(len(sizes), 27)
+    
+    def test_parallel_grow_matches_serial(self):
+        from shape_synthesizer import ShapeSynthesizer
+        xs, ys, out = multi_circle_test([2, 5], [3, 5], [1, 2])
+        examples = list(zip(xs, ys, out))
+        for options in ({}, {'batched_grow': False}):
+            serial = ShapeSynthesizer(goal_directed=False, **options).synthesize(examples, max_iterations=2)
+            parallel = ShapeSynthesizer(goal_directed=False, **options).synthesize(examples, max_iterations=2, workers=2)
+            self.assertEqual(serial, parallel)
+    
+    def test_program_store_rebuilds_programs(self):
+        from enumerative_synthesis import ProgramStore
+        from shape_synthesizer import ShapeSynthesizer
+        synthesizer = ShapeSynthesizer()
+        store = ProgramStore(signature_words=1, capacity=1)
+        circle = store.append(ShapeSynthesizer.TERMINAL, 1, np.zeros(1, dtype=np.uint64), param=len(synthesizer.terminal_bank) - 1)
+        rect = store.append(ShapeSynthesizer.TERMINAL, 1, np.ones(1, dtype=np.uint64), param=0)
+        mirror = store.append(ShapeSynthesizer.MIRROR, 2, np.ones(1, dtype=np.uint64), left=rect)
+        union = store.append(ShapeSynthesizer.UNION, 4, np.ones(1, dtype=np.uint64), left=circle, right=mirror)
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store[rect], np.ones(1, dtype=np.uint64).tobytes())
+        self.assertEqual(synthesizer.materialize(union, store),
+                         Union(Circle(Coordinate(9, 9), 9), Mirror(Rectangle(Coordinate(0, 0), Coordinate(1, 1)))))
+    
+    def test_columnar_and_object_banks_agree(self):
+        from shape_synthesizer import ShapeSynthesizer
+        xs, ys, out = multi_circle_test([2, 5], [3, 5], [1, 2])
+        examples = list(zip(xs, ys, out))
+        columnar = ShapeSynthesizer(goal_directed=False).synthesize(examples, max_iterations=2)
+        objects = ShapeSynthesizer(goal_directed=False, columnar=False).synthesize(examples, max_iterations=2)
+        self.assertEqual(columnar, objects)
+    
+    def test_goal_directed_final_level(self):
+        from shape_synthesizer import ShapeSynthesizer
+        rng = np.random.default_rng(1)
+        for _ in range(10):
+            xs, ys, out = rng.uniform(0, 9, 12), rng.uniform(0, 9, 12), rng.random(12) < 0.5
+            examples = list(zip(xs, ys, out))
+            results = []
+            for goal_directed in (True, False):
+                try:
+                    prog = ShapeSynthesizer(goal_directed=goal_directed).synthesize(examples, max_iterations=1)
+                    np.testing.assert_array_equal(prog.interpret(xs, ys), out)
+                    results.append(prog)
+                except ValueError:
+                    results.append(None)
+            # The smallest correct program of the level, the one enumeration finds first
+            self.assertIs(results[0], results[1])
+    
+    def test_terminal_bank_matches_interpretation(self):
+        from shape_synthesizer import TerminalBank
+        bank = TerminalBank()
+        xs, ys, _ = random_test(0, 50)
+        xs, ys = np.concatenate([xs, [2.0, 3.0, 7.0]]), np.concatenate([ys, [2.0, 5.0, 4.0]])
+        membership = bank.membership(xs, ys)
+        for index in range(0, len(bank), 7):
+            np.testing.assert_array_equal(membership[index], bank.shape(index).interpret(xs, ys))
+
+    def test_shapes_are_hash_consed(self):
+        import pickle
+        circle = Circle(Coordinate(4, 4), 3)
+        program = Union(Mirror(circle), Rectangle(Coordinate(1, 2), Coordinate(3, 4)))
+        self.assertIs(Circle(Coordinate(4, 4), radius=3), circle)
+        self.assertIs(Circle(radius=3, center=Coordinate(4, 4)), circle)
+        self.assertIs(Mirror(shape=circle), Mirror(circle))
+        # Equal arguments of different types are different nodes
+        self.assertIsNot(Circle(Coordinate(4, 4), 3.0), circle)
+        self.assertIsInstance(Circle(Coordinate(4, 4), 3.0).radius, float)
+        self.assertIs(Union(Mirror(Circle(Coordinate(4, 4), 3)), Rectangle(Coordinate(1, 2), Coordinate(3, 4))), program)
+        self.assertIs(pickle.loads(pickle.dumps(program)), program)
+        self.assertNotEqual(Intersection(program.first, program.second), program)
+        self.assertFalse(hasattr(program, '__dict__'))
+
+    def test_compiled_shape_matches_interpretation(self):
+        xs, ys, _ = random_test(0, 1000)
+        circle = Circle(Coordinate(4, 4), 3)
+        program = Subtraction(Mirror(Union(circle, Triangle(Coordinate(1, 0), Coordinate(8, 5)))),
+                              Intersection(circle, Rectangle(Coordinate(3, 3), Coordinate(9, 9))))
+        compiled = program.compile(chunk_size=128)
+        np.testing.assert_array_equal(compiled(xs, ys), program.interpret(xs, ys))
+        out = np.empty(len(xs), dtype=bool)
+        self.assertIs(compiled(xs, ys, out=out), out)
+        np.testing.assert_array_equal(out, program.interpret(xs, ys))
+        # A strided view would only receive a copy of the results
+        with self.assertRaises(ValueError):
+            compiled(xs, ys, out=np.empty(2 * len(xs), dtype=bool)[::2])
+        # The shared circle is evaluated once per coordinate order
+        self.assertEqual(len(compiled.instructions), 10)
+
+    def test_is_correct_tries_recent_counterexamples_first(self):
+        from shape_synthesizer import ShapeSynthesizer
+        synthesizer = ShapeSynthesizer()
+        examples = [(1, 1, True), (5, 5, True), (8, 8, False)]
+        square = Rectangle(Coordinate(0, 0), Coordinate(9, 9))
+        self.assertFalse(synthesizer.is_correct(square, examples))
+        self.assertEqual(synthesizer.counterexamples, [2])
+        self.assertFalse(synthesizer.is_correct(Rectangle(Coordinate(0, 0), Coordinate(2, 2)), examples))
+        self.assertEqual(synthesizer.counterexamples, [1, 2])
+        self.assertTrue(synthesizer.is_correct(Rectangle(Coordinate(0, 0), Coordinate(6, 6)), examples))
+        examples.append((3, 3, False))
+        self.assertFalse(synthesizer.is_correct(square, examples))
+        self.assertEqual(synthesizer.example_order(4), [2, 1, 0, 3])
+    
+    def test_examples_relabelled_in_place_are_not_stale(self):
+        from shape_synthesizer import ShapeSynthesizer
+        synthesizer = ShapeSynthesizer()
+        examples = [(1, 1, True), (5, 5, True), (8, 8, False)]
+        first = synthesizer.synthesize(examples, max_iterations=1)
+        self.assertTrue(synthesizer.is_correct(first, examples))
+        examples[2] = (8, 8, True)
+        self.assertFalse(synthesizer.is_correct(first, examples))
+        self.assertEqual(synthesizer.failing_examples(first, examples), [2])
+        second = synthesizer.synthesize(examples, max_iterations=1)
+        self.assertTrue(second.interpret(8, 8))
+        self.assertTrue(synthesizer.is_correct(second, examples))
+        self.assertIsNone(synthesizer.run_cache)
+
+    def test_cegis_solves_large_example_sets(self):
+        from shape_synthesizer import ShapeSynthesizer
+        rng = np.random.default_rng(3)
+        xs, ys = rng.uniform(0, 10, 5000), rng.uniform(0, 10, 5000)
+        target = Subtraction(Circle(Coordinate(5, 5), 4), Rectangle(Coordinate(2, 2), Coordinate(6, 4)))
+        examples = list(zip(xs, ys, target.interpret(xs, ys)))
+        synthesizer = ShapeSynthesizer()
+        prog = synthesizer.synthesize_cegis(examples, max_iterations=1, initial_examples=16)
+        self.assertEqual(synthesizer.failing_examples(prog, examples), [])
+
+    def test_examples_compressed_to_distinguishable_points(self):
+        from shape_synthesizer import ShapeSynthesizer
+        # (9.3, 0.4) and (9.4, 0.5) lie in exactly the same terminals, and so do their mirror images
+        examples = [(9.3, 0.4, True), (5, 5, False), (9.4, 0.5, True), (5, 5, False), (3, 4, False)]
+        synthesizer = ShapeSynthesizer()
+        test_inputs = synthesizer.extract_test_inputs(examples)
+        np.testing.assert_array_equal(synthesizer.representatives, [0, 1, 4])
+        np.testing.assert_array_equal(test_inputs[0][0], [9.3, 5, 3])
+        prog = synthesizer.synthesize(examples, max_iterations=1)
+        self.assertTrue(synthesizer.is_correct(prog, examples))
+        with self.assertRaises(ValueError):
+            synthesizer.synthesize([(9.3, 0.4, True), (9.4, 0.5, False)], max_iterations=1)
+
+    def test_checkpoint_resumes_from_saved_levels(self):
+        import tempfile
+        for options in self.storage_options:
+            expected = self.ShapeSynthesizer(**options).synthesize(self.examples, max_iterations=2)
+            with tempfile.TemporaryDirectory() as checkpoint_dir:
+                with self.assertRaises(ValueError):
+                    self.ShapeSynthesizer(**options).synthesize(self.examples, max_iterations=1,
+                                                                checkpoint_dir=checkpoint_dir)
+                resumed = self.ShapeSynthesizer(**options)
+                # Terminals come from the checkpoint instead of being enumerated again
+                resumed.unique_terminals = None
+                self.assertEqual(resumed.synthesize(self.examples, max_iterations=2, checkpoint_dir=checkpoint_dir),
+                                 expected)
+
+    def test_session_searches_only_when_an_example_contradicts_the_program(self):
+        from enumerative_synthesis import SynthesisSession
+        session = SynthesisSession(self.ShapeSynthesizer(), max_iterations=2)
+        first = session.add_example((2, 2, True))
+        self.assertIs(session.add_example((5, 5, bool(first.interpret(5, 5)))), first)
+        self.assertEqual((session.searches, session.reused), (1, 1))
+        prog = session.add_example((8, 1, not first.interpret(8, 1)))
+        self.assertEqual(session.searches, 2)
+        self.assertTrue(self.ShapeSynthesizer().is_correct(prog, session.examples))
+
+    def test_session_extends_its_bank_and_matches_a_fresh_search(self):
+        from enumerative_synthesis import SynthesisSession
+        for options in self.storage_options:
+            session = SynthesisSession(self.ShapeSynthesizer(**options), max_iterations=3)
+            for index, example in enumerate(self.examples):
+                synthesizer, searches = session.synthesizer, session.searches
+                bank = [[synthesizer.materialize(program, session.cache) for program in level]
+                        for level in session.levels]
+                prog = session.add_example(example)
+                self.assertTrue(synthesizer.is_correct(prog, self.examples[:index + 1]))
+                if session.searches == searches:
+                    continue
+                for kept, level in zip(bank, session.levels):
+                    self.assertEqual([synthesizer.materialize(program, session.cache)
+                                      for program in level[:len(kept)]], kept)
+                fresh = self.ShapeSynthesizer(**options).synthesize(self.examples[:index + 1], max_iterations=3)
+                self.assertEqual(prog.size(), fresh.size())
+
+    def test_session_extends_signatures_when_an_example_contradicts_the_program(self):
+        from enumerative_synthesis import SynthesisSession
+        # The program before the last example is a Union found at the second level
+        rng = np.random.default_rng(0)
+        xs, ys = rng.uniform(0, 9, 16), rng.uniform(0, 9, 16)
+        examples = list(zip(xs, ys, ((xs - 4) ** 2 + (ys - 5) ** 2 < 9) ^ ((xs > 6) & (ys < 3))))
+        for options in self.storage_options:
+            session = SynthesisSession(self.ShapeSynthesizer(**options), max_iterations=2)
+            for example in examples[:-1]:
+                session.add_example(example)
+            synthesizer, searches = session.synthesizer, session.searches
+            bank = [[synthesizer.materialize(program, session.cache) for program in level]
+                    for level in session.levels]
+            x, y, _ = examples[-1]
+            prog = session.add_example((x, y, not session.program.interpret(x, y)))
+            self.assertEqual(session.searches, searches + 1)
+            # Examples recorded since the last search are indexed too, and no two points share a class
+            self.assertEqual((session.indexed, len(synthesizer.representatives)), (16, 16))
+            for kept, level in zip(bank, session.levels):
+                self.assertEqual([synthesizer.materialize(program, session.cache)
+                                  for program in level[:len(kept)]], kept)
+            # Extended or grown, every bank signature agrees with one computed from scratch
+            for level in session.levels:
+                for program in level:
+                    shape = synthesizer.materialize(program, session.cache)
+                    self.assertEqual(session.cache[program], synthesizer.compute_signature(shape, session.test_inputs))
+            self.assertTrue(synthesizer.is_correct(prog, session.examples))
+            fresh = self.ShapeSynthesizer(**options).synthesize(session.examples, max_iterations=2)
+            self.assertEqual(prog.size(), fresh.size())
+    
+    def test_limits_return_best_program_so_far(self):
+        for options in self.storage_options:
+            synthesizer = self.ShapeSynthesizer(**options)
+            prog = synthesizer.synthesize(self.examples, max_programs=40)
+            self.assertEqual(synthesizer.stopped_by, 'max_programs')
+            self.assertEqual(synthesizer.last_score, (len(synthesizer.failing_examples(prog, self.examples)), prog.size()))
+            self.assertEqual(synthesizer.last_score, (2, 1))
+            synthesizer.synthesize(self.examples, deadline=60)
+            self.assertIsNone(synthesizer.stopped_by)
+            self.assertEqual(synthesizer.last_score[0], 0)
+    
+    def test_deadline_is_kept_while_a_level_is_enumerated(self):
+        import time
+        # No program of this random labelling is found early, and its second level takes seconds
+        rng = np.random.default_rng(5)
+        xs, ys = rng.uniform(0, 9, 40), rng.uniform(0, 9, 40)
+        examples = list(zip(xs, ys, rng.random(40) < 0.5))
+        for options in self.storage_options + ({'batched_grow': False},):
+            synthesizer = self.ShapeSynthesizer(**options)
+            started = time.monotonic()
+            prog = synthesizer.synthesize(examples, max_iterations=3, deadline=0.5)
+            self.assertLess(time.monotonic() - started, 0.5 + 0.4)
+            self.assertEqual(synthesizer.stopped_by, 'deadline')
+            self.assertEqual(synthesizer.last_score, (len(synthesizer.failing_examples(prog, examples)), prog.size()))
+            self.assertIsNone(synthesizer.deadline_at)
+    
+    def test_observer_receives_metrics_for_every_iteration(self):
+        import io
+        import json
+        from observers import JsonLinesObserver
+        for options in ({}, {'packed_signatures': False}):
+            log = io.StringIO()
+            synthesizer = self.ShapeSynthesizer(**options)
+            synthesizer.observer = JsonLinesObserver(log, run='test')
+            synthesizer.synthesize(self.examples)
+            records = [json.loads(line) for line in log.getvalue().splitlines()]
+            self.assertEqual([record['iteration'] for record in records], [0, 1, 2])
+            self.assertEqual([record['solved'] for record in records], [False, False, True])
+            for record in records:
+                self.assertEqual(record['run'], 'test')
+                self.assertEqual(record['candidates'], record['unique'] + record['duplicates'])
+                self.assertGreater(record['bank_bytes'], 0)
+            self.assertEqual(records[-1]['bank_programs'], sum(record['unique'] for record in records) - 1)
+            self.assertIsNone(synthesizer.metrics)
+    
+    def test_benchmark_comparison_reports_regressions(self):
+        from benchmark import compare
+        def result(status, seconds, rate=1000.0, memory=10.0):
+            return {'status': status, 'seconds': seconds, 'programs_per_second': rate, 'peak_memory_mb': memory}
+        baseline = {'a': result('solved', 1.0), 'b': result('stopped', 2.0), 'c': result('solved', 0.01)}
+        self.assertEqual(compare({'a': result('solved', 1.1), 'b': result('solved', 0.5), 'c': result('solved', 0.03),
+                                  'new': result('unsolved', 9.0)}, baseline), [])
+        regressions = compare({'a': result('solved', 2.0, rate=500.0, memory=40.0), 'b': result('timeout', 90.0)},
+                              baseline)
+        self.assertEqual(len(regressions), 4)
+        self.assertTrue(regressions[-1].startswith("b: stopped -> timeout"))
+    
+    def test_larger_coordinate_domain_streams_terminals(self):
+        from shape_synthesizer import ShapeSynthesizer, TerminalBank
+        bank = TerminalBank(20)
+        self.assertEqual(len(bank), 2 * (20 * 21 // 2)**2 + 21 * 21 * 20)
+        xs, ys, _ = random_test(0, 30, max_coord=20)
+        np.testing.assert_array_equal(bank.membership(xs, ys, 88000, 90000),
+                                      [bank.shape(index).interpret(xs, ys) for index in range(88000, 90000)])
+        examples = [(13, 4, True), (17.5, 14, True), (11, 4, False), (15, 16, False), (19, 10, False), (14, 9, True)]
+        programs = [ShapeSynthesizer(max_coord=20, block_bytes=block_bytes).synthesize(examples, max_iterations=1)
+                    for block_bytes in (2**12, 64 * 2**20)]
+        self.assertIs(programs[0], programs[1])
+        self.assertTrue(ShapeSynthesizer().is_correct(programs[0], examples))
+    
+    def test_redundant_compositions_are_rejected_before_evaluation(self):
+        from shapes import canonical
+        from shape_synthesizer import ShapeSynthesizer
+        a, b = Circle(Coordinate(2, 2), 2), Rectangle(Coordinate(1, 0), Coordinate(4, 3))
+        for operator, first, second in [(Mirror, Mirror(a), None), (Subtraction, a, a), (Union, a, Intersection(a, b)),
+                                        (Intersection, Union(b, a), a), (Union, Mirror(a), a),
+                                        (Subtraction, Subtraction(a, b), b), (Subtraction, a, Union(b, a))]:
+            self.assertIsNone(canonical(operator, first, second))
+        self.assertIs(canonical(Union, b, a), canonical(Union, a, b))
+        self.assertIs(canonical(Subtraction, a, Intersection(a, b)), Subtraction(a, Intersection(a, b)))
+        
+        # Batched and nested-loop growth reject the same candidates at the level where the rules first apply
+        xs, ys, out = random_test(3, 8)
+        examples = list(zip(xs, ys, out))
+        grown = []
+        for options in ({}, {'columnar': False}, {'batched_grow': False}):
+            synthesizer = ShapeSynthesizer(**options)
+            test_inputs = synthesizer.extract_test_inputs(examples)
+            cache = synthesizer.create_cache(test_inputs)
+            bank = list(synthesizer.unique_terminals(examples, test_inputs, cache))
+            bank += list(synthesizer.grow_unique(bank, examples, test_inputs, cache, 1))
+            grown.append([synthesizer.materialize(program, cache)
+                          for program in synthesizer.grow_unique(bank, examples, test_inputs, cache, 2)])
+        self.assertTrue(grown[0])
+        self.assertEqual(grown[0], grown[1])
+        self.assertEqual(grown[0], grown[2])
+        # Commutative operands come out in the order canonical gives them
+        for program in grown[0]:
+            if isinstance(program, (Union, Intersection)):
+                self.assertIs(canonical(type(program), program.second, program.first), program)
+    
+    def test_commutative_operand_order_does_not_depend_on_construction_history(self):
+        from shapes import canonical
+        # The larger operand is built, and held, before the smaller one
+        late, early = Rectangle(Coordinate(0, 6), Coordinate(8, 8)), Rectangle(Coordinate(0, 0), Coordinate(2, 2))
+        expected = canonical(Union, late, early)
+        self.assertIs(canonical(Union, early, late), expected)
+        self.assertIs(expected.first, early)
+        self.assertIs(canonical(Intersection, Mirror(late), early), canonical(Intersection, early, Mirror(late)))
+        xs, ys = (values.ravel() for values in np.meshgrid(np.arange(0.5, 9), np.arange(0.5, 9)))
+        examples = list(zip(xs.tolist(), ys.tolist(), expected.interpret(xs, ys).tolist()))
+        for options in ({}, {'columnar': False}, {'batched_grow': False}):
+            self.assertIs(self.ShapeSynthesizer(**options).synthesize(examples, max_iterations=1), expected)
+    
+    def test_bounding_boxes_contain_shapes_and_prune_compositions(self):
+        from shapes import EMPTY_BOUNDS, is_redundant
+        a, b = Rectangle(Coordinate(0, 0), Coordinate(2, 2)), Circle(Coordinate(7, 3), 1)
+        self.assertEqual(b.bounds, (6, 2, 8, 4))
+        self.assertEqual(Mirror(b).bounds, (2, 2, 8, 8))
+        self.assertEqual(Intersection(a, b).bounds, EMPTY_BOUNDS)
+        self.assertTrue(is_redundant(Intersection, a, b))
+        self.assertTrue(is_redundant(Subtraction, a, b))
+        self.assertFalse(is_redundant(Intersection, a, Mirror(Triangle(Coordinate(2, 0), Coordinate(5, 1)))))
+        
+        # Every shape lies inside its box, and compiled evaluation skipping the outside agrees with interpret
+        xs, ys = np.meshgrid(np.linspace(-2, 12, 141), np.linspace(-2, 12, 141))
+        for shape in [a, b, Mirror(b), Union(a, b), Subtraction(Mirror(b), a), Intersection(Mirror(b), b)]:
+            x0, y0, x1, y1 = shape.bounds
+            inside = (x0 <= xs) & (xs <= x1) & (y0 <= ys) & (ys <= y1)
+            values = shape.interpret(xs, ys)
+            self.assertFalse(np.any(values & ~inside), str(shape))
+            np.testing.assert_array_equal(shape.compile(chunk_size=100)(xs, ys), values)
+        
+        from shape_synthesizer import ShapeSynthesizer
+        grown = list(ShapeSynthesizer().grow([a, b], []))
+        self.assertIn(Union(a, b), grown)
+        self.assertNotIn(Intersection(a, b), grown)
+        self.assertNotIn(Subtraction(a, b), grown)
+        self.assertNotIn(Subtraction(b, a), grown)
+    
+    def test_shape_bank_answers_many_labellings_of_one_point_set(self):
+        from shape_synthesizer import ShapeBank, ShapeSynthesizer
+        xs, ys = (values.ravel() for values in np.meshgrid(np.arange(0, 10, 3.0), np.arange(0, 10, 3.0)))
+        bank = ShapeBank(xs, ys, depth=1)
+        rng = np.random.default_rng(7)
+        for labels in [Circle(Coordinate(3, 3), 2).interpret(xs, ys),
+                       Mirror(Rectangle(Coordinate(0, 5), Coordinate(4, 9))).interpret(xs, ys),
+                       rng.random(len(xs)) < 0.4, rng.random(len(xs)) < 0.6]:
+            examples = list(zip(xs.tolist(), ys.tolist(), labels.tolist()))
+            try:
+                expected = ShapeSynthesizer().synthesize(examples, max_iterations=2)
+            except ValueError:
+                self.assertRaises(ValueError, bank.synthesize, labels)
+                continue
+            program = bank.synthesize(labels)
+            self.assertIs(program, expected)
+            np.testing.assert_array_equal(program.interpret(xs, ys), labels)
+        
+        with self.assertRaises(ValueError):
+            bank.synthesize([True])
+    
+    def test_program_library_answers_repeated_intents_without_enumerating(self):
+        import tempfile
+        from program_library import ProgramLibrary
+        from shape_synthesizer import ShapeSynthesizer
+        from observers import SynthesisObserver
+        
+        class Iterations(SynthesisObserver):
+            def __init__(self):
+                self.count = 0
+            
+            def on_iteration(self, metrics):
+                self.count += 1
+        
+        disc = Circle(Coordinate(4, 4), 3)
+        rng = np.random.default_rng(3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "library.pkl")
+            programs = []
+            for _ in range(2):
+                # The same intent sampled on different points
+                xs, ys = rng.uniform(0, 9, 30), rng.uniform(0, 9, 30)
+                synthesizer = ShapeSynthesizer()
+                synthesizer.library, synthesizer.observer = ProgramLibrary(path), Iterations()
+                programs.append(synthesizer.synthesize(list(zip(xs, ys, disc.interpret(xs, ys))), max_iterations=2))
+            self.assertEqual(programs, [disc, disc])
+            self.assertEqual(synthesizer.observer.count, 0)
+            self.assertEqual(synthesizer.last_score, (0, 1))
+            entry, = ProgramLibrary(path).sections["ShapeSynthesizer/9"].values()
+            self.assertEqual(entry.hits, 2)
+    
+    def test_library_only_keeps_programs_verified_on_all_cegis_examples(self):
+        from program_library import ProgramLibrary
+        rng = np.random.default_rng(3)
+        xs, ys = rng.uniform(0, 10, 3000), rng.uniform(0, 10, 3000)
+        target = Subtraction(Circle(Coordinate(5, 5), 4), Rectangle(Coordinate(2, 2), Coordinate(6, 4)))
+        examples = list(zip(xs, ys, target.interpret(xs, ys)))
+        synthesizer = self.ShapeSynthesizer()
+        synthesizer.library = ProgramLibrary()
+        prog = synthesizer.synthesize_cegis(examples, max_iterations=1, initial_examples=16)
+        # The rounds' solutions of example subsets are not stored
+        entry, = synthesizer.library.sections[synthesizer.library_domain()].values()
+        self.assertIs(entry.program, prog)
+        self.assertEqual(synthesizer.failing_examples(entry.program, examples), [])
+        # A repeated task is answered from the library
+        synthesizer.synthesize = None
+        self.assertIs(synthesizer.synthesize_cegis(examples, max_iterations=1, initial_examples=16), prog)
+        self.assertEqual((len(synthesizer.library), entry.hits), (1, 2))
+    
+    def test_best_first_strategy_reaches_deep_solutions_early(self):
+        from shape_synthesizer import ShapeSynthesizer
+        from observers import SynthesisObserver
+        
+        class Records(SynthesisObserver):
+            def __init__(self):
+                self.records = []
+            
+            def on_iteration(self, metrics):
+                self.records.append(metrics)
+        
+        xs, ys, out = multi_circle_test([2, 6, 7], [3, 6, 2], [1, 2, 1])
+        examples = list(zip(xs, ys, out))
+        synthesizer = ShapeSynthesizer()
+        synthesizer.observer = Records()
+        program = synthesizer.synthesize(examples, max_iterations=3, strategy='best_first')
+        np.testing.assert_array_equal(program.interpret(xs, ys), out)
+        self.assertLessEqual(program.size(), 15)
+        self.assertEqual(synthesizer.last_score, (0, program.size()))
+        record, = synthesizer.observer.records
+        self.assertTrue(record['solved'])
+        # Equivalence elimination keeps one bank entry per signature
+        self.assertLess(record['bank_programs'], record['candidates'])
+        # Unpacked signatures cover point classes, not examples: repeated points share one class
+        xs, ys, out = multi_circle_test([2, 6], [3, 6], [1, 2])
+        repeated = list(zip(xs, ys, out))
+        unpacked = ShapeSynthesizer(packed_signatures=False).synthesize(repeated + repeated[:10], max_iterations=3,
+                                                                         strategy='best_first')
+        np.testing.assert_array_equal(unpacked.interpret(xs, ys), out)
+        
+        # Terminals are checked in the same order by both strategies
+        xs, ys, out = random_test(1, 5)
+        self.assertEqual(ShapeSynthesizer().synthesize(list(zip(xs, ys, out)), max_iterations=0, strategy='best_first'),
+                         ShapeSynthesizer().synthesize(list(zip(xs, ys, out)), max_iterations=0))
+        with self.assertRaises(ValueError):
+            synthesizer.synthesize(examples, strategy='depth_first')
+
+
 def reset_random_seed():
     """Reset random seed to ensure reproducible results"""
     random.seed(RANDOM_SEED)
@@ -333,5 +333,68 @@ class TestPart2Strings(unittest.TestCase):
         ]
         self._test_string_synthesis(examples, "create_acronym")
 
+class TestStringSynthesizerEngine(unittest.TestCase):
+    """Test cases for the string synthesizer internals"""
+    
+    examples = [("ab", "ab"), ("cd", "cd-"), ("ef", "ef-"), ("gh", "gh")]
+    
+    def test_is_correct_tries_recent_counterexamples_first(self):
+        from string_synthesizer import StringSynthesizer
+        from strings import InputString, StringLiteral, Concatenate
+        synthesizer = StringSynthesizer()
+        self.assertFalse(synthesizer.is_correct(InputString(), self.examples))
+        self.assertEqual(synthesizer.counterexamples, [1])
+        # The recorded counterexample rejects the next candidate before the first example is tried
+        self.assertFalse(synthesizer.is_correct(StringLiteral("ab"), self.examples))
+        self.assertEqual(synthesizer.counterexamples, [1])
+        self.assertFalse(synthesizer.is_correct(Concatenate(InputString(), StringLiteral("-")), self.examples))
+        self.assertEqual(synthesizer.counterexamples, [0, 1])
+        self.assertEqual(synthesizer.example_order(len(self.examples)), [0, 1, 2, 3])
+        self.assertTrue(synthesizer.is_correct(InputString(), [("ab", "ab")]))
+    
+    def test_failing_examples_lists_every_wrong_example(self):
+        from string_synthesizer import StringSynthesizer
+        from strings import InputString, StringLiteral, Concatenate
+        synthesizer = StringSynthesizer()
+        self.assertEqual(synthesizer.failing_examples(InputString(), self.examples), [1, 2])
+        self.assertEqual(synthesizer.failing_examples(Concatenate(InputString(), StringLiteral("-")), self.examples),
+                         [0, 3])
+        self.assertEqual(synthesizer.failing_examples(StringLiteral("ab"), self.examples), [1, 2, 3])
+    
+    def test_best_program_scores_the_bank_from_the_cached_outputs(self):
+        from string_synthesizer import StringSynthesizer
+        from strings import InputString, StringLiteral, Concatenate
+        synthesizer = StringSynthesizer()
+        inputs = synthesizer.extract_test_inputs(self.examples)
+        bank = [StringLiteral("ab"), Concatenate(InputString(), StringLiteral("")), InputString()]
+        cache = {program: synthesizer.compute_signature(program, inputs) for program in bank}
+        # Equally many misclassified examples: the smaller program wins
+        self.assertEqual(synthesizer.best_program(bank, self.examples, cache), (InputString(), (2, 1)))
+        self.assertEqual(synthesizer.best_program(bank[:1], self.examples, cache), (StringLiteral("ab"), (3, 1)))
+    
+    def test_program_library_keeps_the_smaller_and_more_frequent_programs(self):
+        from program_library import ProgramLibrary
+        from string_synthesizer import StringSynthesizer
+        from strings import InputString, StringLiteral, Concatenate
+        # Programs with equal outputs on the probes are stored once, as the smaller one
+        library = ProgramLibrary(max_entries=2)
+        strings = StringSynthesizer()
+        library.add(strings, Concatenate(InputString(), StringLiteral("")))
+        library.add(strings, InputString())
+        self.assertEqual(len(library), 1)
+        self.assertIs(library.lookup(strings, [("ab", "ab")]), InputString())
+        # The frequently used program outlives a newer one when the library overflows
+        library.add(strings, StringLiteral("-"))
+        library.add(strings, StringLiteral("."))
+        self.assertEqual(len(library), 2)
+        self.assertIs(library.lookup(strings, [("ab", "ab")]), InputString())
+        self.assertIsNone(library.lookup(strings, [("ab", "-")]))
+    
+    def test_best_first_is_rejected_before_enumeration(self):
+        from string_synthesizer import StringSynthesizer
+        # Rejected up front, not after the terminals have been enumerated
+        with self.assertRaises(ValueError):
+            StringSynthesizer().synthesize([("ab", "ab")], strategy='best_first')
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file